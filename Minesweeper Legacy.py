@@ -4,20 +4,31 @@ Minesweeper Legacy: Used the original Minesweeper game from Github library and a
 Use hints from numbers on box that will tell you the surrounding amount of bombs on 8 spaces around that box and avoid them!
 """
 
-import random, pygame, sys, json, os
-from pygame.locals import QUIT, MOUSEBUTTONDOWN, KEYDOWN, K_ESCAPE, K_SPACE
+import pygame, sys, json, os, time, math, argparse, multiprocessing, threading, queue, collections, bisect, struct, gc, tracemalloc, platform, asyncio, concurrent.futures
+import numpy as np
+from pygame.locals import QUIT, MOUSEBUTTONDOWN, MOUSEBUTTONUP, MOUSEMOTION, MOUSEWHEEL, KEYDOWN, K_ESCAPE, K_SPACE, K_h, K_p
+from pygame.locals import K_LEFT, K_RIGHT, K_UP, K_DOWN, K_F3, K_F4, VIDEOEXPOSE, WINDOWEXPOSED
 
 # ====================== Setting up window constraints ======================
 
-FPS = 30
+FPS = 30 # Frame rate while an animation is running (the loop sleeps otherwise)
 WINDOWWIDTH = 800
 WINDOWHEIGHT = 800
 BOXSIZE = 30
 GAPSIZE = 5
-FIELDWIDTH = 20
+FIELDWIDTH = 20 # Board size in boxes (--size can make it larger than the view)
 FIELDHEIGHT = 20
-XMARGIN = int((WINDOWWIDTH - (FIELDWIDTH * (BOXSIZE + GAPSIZE))) / 2)
-YMARGIN = int((WINDOWHEIGHT - (FIELDHEIGHT * (BOXSIZE + GAPSIZE))) / 2)
+VIEWWIDTH = 20 # Boxes that fit in the view at normal zoom
+VIEWHEIGHT = 20
+XMARGIN = int((WINDOWWIDTH - (VIEWWIDTH * (BOXSIZE + GAPSIZE))) / 2)
+YMARGIN = int((WINDOWHEIGHT - (VIEWHEIGHT * (BOXSIZE + GAPSIZE))) / 2)
+
+# Camera: box pitch (box plus gap, in pixels) at each zoom step, the pitch
+# below which boxes are drawn as plain colored pixels, and how far the
+# arrow keys scroll per frame
+ZOOM_PITCHES = (1, 2, 3, 5, 8, 12, 18, 25, BOXSIZE + GAPSIZE, 50, 70)
+TILE_MIN_PITCH = 8
+PAN_STEP = 20
 
 # =============== Setting up difficulty settings and initial value  ===============
 
@@ -25,9 +36,133 @@ VERY_EASY_MINES = 10
 EASY_MINES = 30
 NORMAL_MINES = 50
 HARD_MINES = 70
+FLASH_PULSES = 3 # Number of game-over flashes before the screen holds still
+
+# ========================= Headless simulation settings =========================
+
+SIM_CLICK_MS = 500 # Simulated time a bot click takes
+SIM_SHARD_SIZE = 500 # Games handed to a worker process at a time
+
+# ============================== Benchmark settings ==============================
+
+BENCH_SIZES = ((20, 20), (200, 200), (2000, 2000)) # Board sizes timed by --bench
+BENCH_DENSITIES = (0.10, 0.20) # Fraction of boxes that are mines
+BENCH_SEED = 0 # Every run times the same boards
+BENCH_REPEATS = 5 # Samples per case; the fastest one counts
+BENCH_MIN_TIME = 0.05 # Seconds a sample of a quick case is stretched to
+BENCH_PICKS = 1000 # Pixels looked up per getBoxAtPixel sample
+BENCH_FLAGS = 1000 # Boxes flagged and unflagged per flag sample
+BENCH_WIN_CHECKS = 10000 # all_safe_revealed calls per sample
+BENCH_THRESHOLD = 0.25 # Slowdown against the baseline that counts as a regression
+
+# ============================== Game server settings ==============================
+
+SERVER_HOST = '127.0.0.1' # --server listens here (or on a Unix socket with --unix)
+SERVER_PORT = 8765
+SERVER_MAX_BOXES = 1000000 # Largest board a client may ask for
+LOADGEN_CLIENTS = 100 # Connections opened by --loadgen, each playing its own games
+LOADGEN_SECONDS = 10.0
+LOADGEN_FLAG_RATE = 0.1 # Share of load-generator moves that place a flag
+
+# ============================ Board generation settings ============================
+
+# Random boards place mines up front, first-click-safe boards wait for the
+# first click and keep it (and its neighbors) clear, no-guess boards are
+# also checked to be solvable from a marked start box by logic alone
+BOARD_RANDOM = 'random'
+BOARD_SAFE = 'safe'
+BOARD_NOGUESS = 'noguess'
+BOARDMODE = BOARD_RANDOM
+POOL_SIZE = 3 # Ready no-guess boards kept per difficulty
+NOGUESS_MAX_ATTEMPTS = 2000 # Layouts tried before settling for a first-click-safe one
+
+# Solver limits: layouts explored per frontier component before it is only
+# estimated, frontier size up to which probabilities are combined exactly,
+# and how the interior mine density is refined on larger boards
+SOLVER_NODE_BUDGET = 50000
+SOLVER_EXACT_LIMIT = 400
+SOLVER_DENSITY_ROUNDS = 4
+SOLVER_ODDS_DIGITS = 3 # Decimal places the interior log-odds are rounded to
+SOLVER_RESCAN_SHARE = 0.05 # Share of the board changed at which a full rescan beats an update
+
+# Batched environment actions, observation codes and rewards
+ACTION_REVEAL = 0
+ACTION_FLAG = 1
+OBS_COVERED = -1
+OBS_FLAGGED = -2
+OBS_MINE = -3
+REWARD_WIN = 1.0
+REWARD_LOSS = -1.0
 currentDifficulty = 'NORMAL'
 MINESTOTAL = NORMAL_MINES
 
+# ============================== Score store settings ==============================
+
+SCORE_CHECKPOINT_LINES = 1000 # Journal lines read at startup before the index checkpoint is rewritten
+
+# ============================== Save and resume settings ==============================
+
+SNAPSHOT_FILE = 'autosave.msl' # Where the game in progress is saved
+AUTOSAVE_MOVES = 10 # Moves between autosaves
+RESUME = None # Snapshot to resume at startup (--resume)
+# Snapshot header: magic, version, width, height, mine count, elapsed ms,
+# state bits, safe start box (-1 for none) and difficulty label. The bit
+# planes follow at SNAPSHOT_HEADER_SIZE, then the board's seed (unsigned,
+# little-endian) when SNAP_SEEDED is set.
+SNAPSHOT_MAGIC = b'MSLS'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct('<4sHIIIqBq16s')
+SNAPSHOT_HEADER_SIZE = 64
+SNAP_STARTED = 0x01
+SNAP_PAUSED = 0x02
+SNAP_GAME_OVER = 0x04
+SNAP_WIN = 0x08
+SNAP_MINES_PLACED = 0x10
+SNAP_SEEDED = 0x20
+SNAPSHOT_SEED_SIZE = 16
+
+# ============================== Input recording settings ==============================
+
+# Actions in an input log: reveal (left click), flag (right click/SPACE), pause (ESC)
+REPLAY_REVEAL = 'r'
+REPLAY_FLAG = 'f'
+REPLAY_PAUSE = 'p'
+RECORD = None # Input log to write while playing (--record)
+REPLAY = None # Input log to play back in the window (--replay)
+
+# ============================== Frame profiler settings ==============================
+
+# Main loop stages timed every frame, then engine calls made inside them
+PROFILE_STAGES = ('events', 'pick', 'board', 'hud', 'display')
+PROFILE_ENGINE = ('reveal', 'win_check')
+PROFILE_WINDOW = 300 # Frames behind the overlay's histogram and percentiles
+PROFILE_TRACE_FRAMES = 100000 # Frames kept for export (oldest dropped first)
+# Upper edges of the overlay's frame-time histogram buckets in milliseconds
+PROFILE_BUCKETS = (1, 2, 4, 8, 16, 33, 66, math.inf)
+PROFILE_FILE = 'frames.csv' # Trace written by F4 (.json for a JSON trace)
+PROFILE = None # Trace to write on exit, with the overlay shown from the start (--profile)
+
+# ============================ Endless board settings ============================
+
+CHUNK_SIZE = 32 # Endless boards are made of CHUNK_SIZE x CHUNK_SIZE chunks
+CHUNK_CACHE_SIZE = 1024 # Generated chunks kept in memory before the least recently used is dropped
+ENDLESS_DENSITY = 0.15 # Share of boxes in every chunk that are mines
+ENDLESS_FLOOD_LIMIT = 100000 # Boxes one reveal may open; clicking an opened blank box goes on
+ENDLESS = False # Play an endless board in the window (--endless)
+
+# ==================== Packed cell layout (one byte per box) ====================
+
+CELL_COUNT_MASK = 0x0F  # Number of neighboring mines (0-8)
+CELL_MINE = 0x10
+CELL_REVEALED = 0x20
+CELL_FLAGGED = 0x40
+
+# The 8 directions around a box, and the ring size at which the flood fill
+# switches from a plain Python loop to NumPy batches
+NEIGHBOR_OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+FLOOD_VECTOR_MIN = 64
+NO_CHANGES = np.empty(0, dtype=np.intp)
+
 # =============================== Assertions ===============================
 
 assert BOXSIZE/2 > 5, 'Bounding errors when drawing rectangle'
@@ -50,22 +185,96 @@ TEXTCOLOR_3 = BLACK
 HILITECOLOR = GREEN
 RESETBGCOLOR = LIGHTGRAY
 MINEMARK_COV = RED
+HINTCOLOR = BLUE
+HEATCOLOR_SAFE = GREEN
+HEATCOLOR_MINE = RED
+HEATLEVELS = 10 # Probability steps shown by the heat map
+# Text color for each number clue (index = number of neighboring mines)
+NUMBERCOLORS = (TEXTCOLOR_3, BLUE, GREEN, RED) + (TEXTCOLOR_3,) * 5
 
 # ================================= Font ================================= 
 
 FONTTYPE = 'Courier New'
 FONTSIZE = 20
+# Font files found for FONTTYPE on earlier runs, so startup can skip the
+# system font scan; pygame's bundled font is used if FONTTYPE is missing
+FONT_CACHE_FILE = 'fonts.json'
+FONTPATHS = None # Loaded from FONT_CACHE_FILE on first use
+# Rendered text surfaces keyed by (text, font, color), emptied when it gets full
+TEXTCACHE = {}
+TEXTCACHE_SIZE = 512
+
+# ============================ Startup timing ============================
+
+STARTUP_REPORT = False # Print how long each startup step took (--startup-report)
+STARTUP_MARKS = [('start', time.perf_counter())] # (step, time it finished)
 
 # =========================== Utility Functions ===========================
 
+def getTicks():
+    # Milliseconds on a monotonic clock. Games use this rather than
+    # pygame.time.get_ticks(), which stays at 0 unless pygame.init() ran.
+    return int(time.monotonic() * 1000)
+
+def markStartup(step):
+    STARTUP_MARKS.append((step, time.perf_counter()))
+
+def printStartupReport():
+    # Time each startup step took since the one before, and the running total
+    print("Startup:")
+    for (_, before), (step, after) in zip(STARTUP_MARKS, STARTUP_MARKS[1:]):
+        print(f"  {step:<12} {(after - before) * 1000:8.1f} ms {(after - STARTUP_MARKS[0][1]) * 1000:8.1f} ms")
+
+def resolveFont(bold):
+    # [font file or None, whether bold has to be faked] for FONTTYPE. The
+    # answer is kept in FONT_CACHE_FILE; the system fonts are only scanned
+    # again if the file is missing or the font it names has gone.
+    global FONTPATHS
+    if FONTPATHS is None:
+        try:
+            with open(FONT_CACHE_FILE, 'r') as f:
+                FONTPATHS = json.load(f)
+        except (OSError, ValueError):
+            FONTPATHS = {}
+    key = f"{FONTTYPE}, bold" if bold else FONTTYPE
+    entry = FONTPATHS.get(key)
+    if entry is None or (entry[0] is not None and not os.path.exists(entry[0])):
+        path = pygame.font.match_font(FONTTYPE, bold=bold)
+        # Same file as the regular weight: there is no real bold face
+        entry = [path, bold and (path is None or path == pygame.font.match_font(FONTTYPE))]
+        FONTPATHS[key] = entry
+        try:
+            writeFileAtomically(FONT_CACHE_FILE, json.dumps(FONTPATHS))
+        except OSError:
+            pass
+    return entry
+
+def loadFont(size, bold=False):
+    # FONTTYPE at the given size, like pygame.font.SysFont but without
+    # scanning the system fonts on every launch
+    path, fake_bold = resolveFont(bold)
+    font = pygame.font.Font(path, size)
+    font.set_bold(fake_bold)
+    return font
+
 def terminate():
     # Safely quit the game and close the program
     pygame.quit()
     sys.exit()
 
+def renderText(text, font, color):
+    # Render text once and reuse the surface for identical text afterwards
+    key = (text, id(font), color)
+    textobj = TEXTCACHE.get(key)
+    if textobj is None:
+        if len(TEXTCACHE) >= TEXTCACHE_SIZE:
+            TEXTCACHE.clear()
+        textobj = TEXTCACHE[key] = font.render(text, True, color)
+    return textobj
+
 def drawText(text, font, color, surface, x, y):
     # Render and draw centered text on a given surface
-    textobj = font.render(text, True, color)
+    textobj = renderText(text, font, color)
     textrect = textobj.get_rect()
     textrect.center = (x, y)
     surface.blit(textobj, textrect)
@@ -77,94 +286,386 @@ def drawButton(text, color, bgcolor, center_x, center_y):
     return (butSurf, butRect)
 
 def getLeftTopXY(box_x, box_y):
-    # Get top-left pixel coordinates of the given box
-    left = XMARGIN + box_x * (BOXSIZE + GAPSIZE)
-    top = YMARGIN + box_y * (BOXSIZE + GAPSIZE)
-    return left, top
+    # Get top-left pixel coordinates of the given box (it may be off screen)
+    return CAMERA.box_origin(box_x, box_y)
 
 def getCenterXY(box_x, box_y):
     # Get center pixel coordinates of the given box
-    center_x = XMARGIN + BOXSIZE // 2 + box_x * (BOXSIZE + GAPSIZE)
-    center_y = YMARGIN + BOXSIZE // 2 + box_y * (BOXSIZE + GAPSIZE)
-    return center_x, center_y
+    left, top = CAMERA.box_origin(box_x, box_y)
+    return left + CAMERA.box_size() // 2, top + CAMERA.box_size() // 2
 
 def getBoxAtPixel(x, y):
-    # Convert mouse pixel position to grid box coordinates
-    for box_x in range(FIELDWIDTH):
-        for box_y in range(FIELDHEIGHT):
-            left, top = getLeftTopXY(box_x, box_y)
-            if pygame.Rect(left, top, BOXSIZE, BOXSIZE).collidepoint(x, y):
-                return box_x, box_y
-    return None, None
-
-def highlightBox(box_x, box_y):
+    # Convert mouse pixel position to grid box coordinates,
+    # (None, None) in a gap or outside the board
+    return CAMERA.box_at(x, y)
+
+def highlightBox(box_x, box_y, color=HILITECOLOR):
     # Draw a green outline around a box to indicate hover
     left, top = getLeftTopXY(box_x, box_y)
-    pygame.draw.rect(DISPLAYSURFACE, HILITECOLOR, (left, top, BOXSIZE, BOXSIZE), 4)
+    size = CAMERA.box_size()
+    DISPLAYSURFACE.set_clip(getViewRect())
+    pygame.draw.rect(DISPLAYSURFACE, color, (left, top, size, size), min(4, max(1, size // 6)))
+    DISPLAYSURFACE.set_clip(None)
 
 def highlightButton(butRect):
     # Draw a green border around a button to indicate hover
     pygame.draw.rect(DISPLAYSURFACE, HILITECOLOR, butRect.inflate(8, 8), 4)
 
-# ===================== Draw the empty field (boxes only) =====================
-
-def drawField():
-    for box_x in range(FIELDWIDTH):
-        for box_y in range(FIELDHEIGHT):
-            left, top = getLeftTopXY(box_x, box_y)
-            pygame.draw.rect(DISPLAYSURFACE, BOXCOLOR_REV, (left, top, BOXSIZE, BOXSIZE))
-
-# ===================== Draw mines and number clues =====================
-
-def drawMinesNumbers(field):
+# ===================== Camera: the part of the board shown in the view =====================
+
+def getViewRect():
+    # Window area the boxes are drawn in
+    return pygame.Rect(XMARGIN, YMARGIN,
+                       VIEWWIDTH * (BOXSIZE + GAPSIZE) - GAPSIZE,
+                       VIEWHEIGHT * (BOXSIZE + GAPSIZE) - GAPSIZE)
+
+class Camera:
+    def __init__(self, board_width, board_height):
+        # left/top is the board pixel at the view's top left corner and
+        # pitch the size of a box plus its gap. board_width and board_height
+        # are None on an endless board, which has no edges to stop at.
+        self._board_width = board_width
+        self._board_height = board_height
+        self.left = 0
+        self.top = 0
+        self.pitch = BOXSIZE + GAPSIZE
+        self.clamp()
+
+    def box_size(self):
+        # Box size without the gap at the current zoom
+        return max(1, round(self.pitch * BOXSIZE / (BOXSIZE + GAPSIZE)))
+
+    def get_state(self):
+        # Changes whenever the camera moves or zooms
+        return self.left, self.top, self.pitch
+
+    def _clamp_axis(self, offset, boxes, view_size):
+        # Keep the board in view, centered when it is smaller than the view
+        content = boxes * self.pitch - (self.pitch - self.box_size())
+        if content <= view_size:
+            return (content - view_size) // 2
+        return min(max(offset, 0), content - view_size)
+
+    def clamp(self):
+        if self._board_width is not None:
+            view = getViewRect()
+            self.left = self._clamp_axis(self.left, self._board_width, view.width)
+            self.top = self._clamp_axis(self.top, self._board_height, view.height)
+
+    def pan(self, dx, dy):
+        # Scroll by a number of window pixels
+        self.left += int(dx)
+        self.top += int(dy)
+        self.clamp()
+
+    def zoom(self, steps, x, y):
+        # Move steps along ZOOM_PITCHES (positive zooms in), keeping the
+        # board point under window pixel (x, y) where it is
+        current = min(range(len(ZOOM_PITCHES)), key=lambda k: abs(ZOOM_PITCHES[k] - self.pitch))
+        pitch = ZOOM_PITCHES[min(max(current + steps, 0), len(ZOOM_PITCHES) - 1)]
+        if pitch == self.pitch:
+            return
+        view = getViewRect()
+        x, y = x - view.left, y - view.top
+        self.left = (self.left + x) * pitch // self.pitch - x
+        self.top = (self.top + y) * pitch // self.pitch - y
+        self.pitch = pitch
+        self.clamp()
+
+    def box_origin(self, box_x, box_y):
+        # Window pixel of a box's top left corner
+        return (XMARGIN + box_x * self.pitch - self.left,
+                YMARGIN + box_y * self.pitch - self.top)
+
+    def box_at(self, x, y):
+        # Box under window pixel (x, y). Each box owns a square followed by
+        # a gap, so dividing by the pitch gives the box and the remainder
+        # tells whether we are in the gap after it.
+        if not getViewRect().collidepoint(x, y):
+            return None, None
+        box_x, offset_x = divmod(x - XMARGIN + self.left, self.pitch)
+        box_y, offset_y = divmod(y - YMARGIN + self.top, self.pitch)
+        if offset_x >= self.box_size() or offset_y >= self.box_size():
+            return None, None
+        if self._board_width is not None:
+            if not (0 <= box_x < self._board_width and 0 <= box_y < self._board_height):
+                return None, None
+        return box_x, box_y
+
+    def visible_boxes(self):
+        # (x0, y0, x1, y1): the boxes at least partly in view, ends exclusive
+        view = getViewRect()
+        x0 = self.left // self.pitch
+        y0 = self.top // self.pitch
+        x1 = (self.left + view.width - 1) // self.pitch + 1
+        y1 = (self.top + view.height - 1) // self.pitch + 1
+        if self._board_width is not None:
+            x0, x1 = max(x0, 0), min(x1, self._board_width)
+            y0, y1 = max(y0, 0), min(y1, self._board_height)
+        return x0, y0, max(x0, x1), max(y0, y1)
+
+# ===================== Tile atlas: every kind of box pre-rendered once =====================
+
+def buildTileAtlas():
+    # Build one surface per box look at the current BOXSIZE, then map every
+    # possible cell byte straight to its surface so drawing a box is one blit
+    covered = pygame.Surface((BOXSIZE, BOXSIZE))
+    covered.fill(BOXCOLOR_COV)
+    flagged = pygame.Surface((BOXSIZE, BOXSIZE))
+    flagged.fill(MINEMARK_COV)
+    mine = pygame.Surface((BOXSIZE, BOXSIZE))
+    mine.fill(BOXCOLOR_REV)
+    drawMine(mine, 0, 0)
+    numbers = []
+    for number in range(9):
+        tile = pygame.Surface((BOXSIZE, BOXSIZE))
+        tile.fill(BOXCOLOR_REV)
+        if number:
+            drawText(str(number), BASICFONT, NUMBERCOLORS[number], tile, BOXSIZE // 2, BOXSIZE // 2)
+        numbers.append(tile)
+
+    tiles = []
+    for cell in range(256):
+        if not cell & CELL_REVEALED:
+            tiles.append(flagged if cell & CELL_FLAGGED else covered)
+        elif cell & CELL_MINE:
+            tiles.append(mine)
+        else:
+            tiles.append(numbers[min(cell & CELL_COUNT_MASK, 8)])
+    return tiles
+
+def buildHeatColors():
+    # Covered boxes tinted from green (surely safe) to red (surely a mine),
+    # one color per probability step
+    colors = []
+    for level in range(HEATLEVELS + 1):
+        p = level / HEATLEVELS
+        tint = [round(s + (m - s) * p) for s, m in zip(HEATCOLOR_SAFE, HEATCOLOR_MINE)]
+        colors.append([round(c * 0.4 + t * 0.6) for c, t in zip(BOXCOLOR_COV, tint)])
+    return np.array(colors, dtype=np.uint8)
+
+def buildCellColors():
+    # One color per cell byte, for boxes drawn as plain pixels when zoomed out
+    colors = np.empty((256, 3), dtype=np.uint8)
+    for cell in range(256):
+        if not cell & CELL_REVEALED:
+            colors[cell] = MINEMARK_COV if cell & CELL_FLAGGED else BOXCOLOR_COV
+        elif cell & CELL_MINE:
+            colors[cell] = MINECOLOR
+        elif cell & CELL_COUNT_MASK:
+            number = NUMBERCOLORS[min(cell & CELL_COUNT_MASK, 8)]
+            colors[cell] = [(r + n) // 2 for r, n in zip(BOXCOLOR_REV, number)]
+        else:
+            colors[cell] = BOXCOLOR_REV
+    return colors
+
+HEATCOLORS = buildHeatColors()
+CELLCOLORS = buildCellColors()
+TILECACHE = {} # Box size -> (tiles, heat tiles) scaled down or up from TILES and HEATTILES
+
+def buildHeatTiles():
+    tiles = []
+    for color in HEATCOLORS.tolist():
+        tile = pygame.Surface((BOXSIZE, BOXSIZE))
+        tile.fill(color)
+        tiles.append(tile)
+    return tiles
+
+def getTileAtlas(size):
+    # Tiles and heat tiles for boxes of the given size, scaled once per zoom
+    # level. Many cell bytes share a surface, so each surface is scaled once.
+    if size == BOXSIZE:
+        return TILES, HEATTILES
+    atlas = TILECACHE.get(size)
+    if atlas is None:
+        scaled = {}
+        def scale(tile):
+            if id(tile) not in scaled:
+                scaled[id(tile)] = pygame.transform.smoothscale(tile, (size, size))
+            return scaled[id(tile)]
+        atlas = TILECACHE[size] = ([scale(tile) for tile in TILES], [scale(tile) for tile in HEATTILES])
+    return atlas
+
+def getHeatTile(probability, tiles=None):
+    return (tiles or HEATTILES)[int(round(probability * HEATLEVELS))]
+
+# ===================== Draw mines =====================
+
+def drawMine(surface, left, top):
     half = int(BOXSIZE*0.5) 
     quarter = int(BOXSIZE*0.25)
     eighth = int(BOXSIZE*0.125)
-    
-    for box_x in range(FIELDWIDTH):
-        for box_y in range(FIELDHEIGHT):
-            left, top = getLeftTopXY(box_x, box_y)
-            center_x, center_y = getCenterXY(box_x, box_y)
-            if field[box_x][box_y] == '[X]':
-                pygame.draw.circle(DISPLAYSURFACE, MINECOLOR, (left+half, top+half), quarter)
-                pygame.draw.circle(DISPLAYSURFACE, WHITE, (left+half, top+half), eighth)
-                pygame.draw.line(DISPLAYSURFACE, MINECOLOR, (left+eighth, top+half), (left+half+quarter+eighth, top+half))
-                pygame.draw.line(DISPLAYSURFACE, MINECOLOR, (left+half, top+eighth), (left+half, top+half+quarter+eighth))
-                pygame.draw.line(DISPLAYSURFACE, MINECOLOR, (left+quarter, top+quarter), (left+half+quarter, top+half+quarter))
-                pygame.draw.line(DISPLAYSURFACE, MINECOLOR, (left+quarter, top+half+quarter), (left+half+quarter, top+quarter))
-            else: 
-                for i in range(1, 9):
-                    if field[box_x][box_y] == '[' + str(i) + ']':
-                        if i == 1:
-                            textColor = BLUE
-                        elif i == 2:
-                            textColor = GREEN
-                        elif i == 3:
-                            textColor = RED
-                        else:
-                            textColor = TEXTCOLOR_3
-                        drawText(str(i), BASICFONT, textColor, DISPLAYSURFACE, center_x, center_y)
-
-
-# ===================== Draw box covers (gray for unrevealed box and red for marked mines) =====================
-
-def drawCovers(revealedBoxes, markedMines):
-    for box_x in range(FIELDWIDTH):
-        for box_y in range(FIELDHEIGHT):
-            if not revealedBoxes[box_x][box_y]:
-                left, top = getLeftTopXY(box_x, box_y)
-                if [box_x, box_y] in markedMines:
-                    pygame.draw.rect(DISPLAYSURFACE, MINEMARK_COV, (left, top, BOXSIZE, BOXSIZE))
-                else:
-                    pygame.draw.rect(DISPLAYSURFACE, BOXCOLOR_COV, (left, top, BOXSIZE, BOXSIZE))
+    pygame.draw.circle(surface, MINECOLOR, (left+half, top+half), quarter)
+    pygame.draw.circle(surface, WHITE, (left+half, top+half), eighth)
+    pygame.draw.line(surface, MINECOLOR, (left+eighth, top+half), (left+half+quarter+eighth, top+half))
+    pygame.draw.line(surface, MINECOLOR, (left+half, top+eighth), (left+half, top+half+quarter+eighth))
+    pygame.draw.line(surface, MINECOLOR, (left+quarter, top+quarter), (left+half+quarter, top+half+quarter))
+    pygame.draw.line(surface, MINECOLOR, (left+quarter, top+half+quarter), (left+half+quarter, top+quarter))
+
+# ===================== Draw the boxes in view =====================
+
+def getVisibleHeat(minefield, probabilities, x0, y0, x1, y1):
+    # Slice of the flat probability array covering the visible boxes
+    grid = probabilities.reshape(minefield.get_width(), minefield.get_height())
+    return grid[x0:x1, y0:y1]
+
+def drawBoardTiles(surface, minefield, probabilities=None):
+    # Blit one tile per visible box, in a single pass: the cell byte picks
+    # the tile, and a covered box shows its heat tile when the heat map is on
+    x0, y0, x1, y1 = CAMERA.visible_boxes()
+    tiles, heat_tiles = getTileAtlas(CAMERA.box_size())
+    block = minefield.get_block(x0, y0, x1 - x0, y1 - y0)
+    heat = None
+    if probabilities is not None:
+        heat = getVisibleHeat(minefield, probabilities, x0, y0, x1, y1).tolist()
+    left, top = getLeftTopXY(x0, y0)
+    pitch = CAMERA.pitch
+    blits = []
+    for dx, column in enumerate(block.tolist()):
+        for dy, cell in enumerate(column):
+            tile = tiles[cell]
+            if heat is not None and not cell & (CELL_REVEALED | CELL_FLAGGED) and not math.isnan(heat[dx][dy]):
+                tile = getHeatTile(heat[dx][dy], heat_tiles)
+            blits.append((tile, (left + dx * pitch, top + dy * pitch)))
+    surface.blits(blits, doreturn=False)
+
+def drawBoardPixels(surface, minefield, probabilities=None):
+    # Zoomed far out: every visible box becomes a solid block of color,
+    # looked up for the whole view at once and scaled up by the pitch
+    x0, y0, x1, y1 = CAMERA.visible_boxes()
+    if x1 <= x0 or y1 <= y0:
+        return
+    block = minefield.get_block(x0, y0, x1 - x0, y1 - y0)
+    colors = CELLCOLORS[block]
+    if probabilities is not None:
+        heat = getVisibleHeat(minefield, probabilities, x0, y0, x1, y1)
+        shown = ((block & (CELL_REVEALED | CELL_FLAGGED)) == 0) & ~np.isnan(heat)
+        colors[shown] = HEATCOLORS[np.rint(heat[shown] * HEATLEVELS).astype(np.intp)]
+    pixels = pygame.surfarray.make_surface(colors)
+    pitch = CAMERA.pitch
+    if pitch > 1:
+        pixels = pygame.transform.scale(pixels, ((x1 - x0) * pitch, (y1 - y0) * pitch))
+    surface.blit(pixels, getLeftTopXY(x0, y0))
+
+# ===================== Draw a single box (used for partial redraws) =====================
+
+def drawTile(surface, cell, box_x, box_y, probability=None):
+    # Draw one box at the current zoom and return the rect it covers
+    left, top = getLeftTopXY(box_x, box_y)
+    heat = probability is not None and not cell & (CELL_REVEALED | CELL_FLAGGED) and not np.isnan(probability)
+    if CAMERA.pitch >= TILE_MIN_PITCH:
+        size = CAMERA.box_size()
+        tiles, heat_tiles = getTileAtlas(size)
+        surface.blit(getHeatTile(probability, heat_tiles) if heat else tiles[cell], (left, top))
+    else:
+        size = CAMERA.pitch
+        color = HEATCOLORS[int(round(probability * HEATLEVELS))] if heat else CELLCOLORS[cell]
+        surface.fill(color, (left, top, size, size))
+    return pygame.Rect(left, top, size, size)
+
+def getFieldRect():
+    # Black background rectangle behind the grid
+    return getViewRect().inflate(10, 10)
+
+# ===================== Retained board surface with dirty-rect updates =====================
+
+class BoardRenderer:
+    def __init__(self):
+        # The board is kept drawn on its own window-sized surface, so boxes
+        # sit at the same coordinates there as on the screen. Only the boxes
+        # in view are ever drawn.
+        self._surface = pygame.Surface((WINDOWWIDTH, WINDOWHEIGHT))
+        self._dirty = set() # (x, y) of boxes to redraw
+        self._rebuild = True
+        self._view = None # Camera state the surface was drawn for
+        self._hover = None
+        self._hint = None # Box suggested by the solver, outlined in HINTCOLOR
+        self._heat = None # Mine probabilities shown over covered boxes, if on
+
+    def invalidate(self, changed):
+        # Queue boxes for redraw, given as flat indices or, on an endless
+        # board, as (x, y) rows. The view is rebuilt if most of it changed.
+        x0, y0, x1, y1 = CAMERA.visible_boxes()
+        if len(changed) > (x1 - x0) * (y1 - y0) // 4:
+            self._rebuild = True
+            return
+        boxes = np.asarray(changed, dtype=np.intp)
+        if boxes.ndim == 1:
+            boxes = np.stack(np.divmod(boxes, FIELDHEIGHT), axis=1)
+        self._dirty.update(map(tuple, boxes.tolist()))
+
+    def invalidate_all(self):
+        self._rebuild = True
+
+    def set_hover(self, box_x, box_y):
+        # Move the hover outline, redrawing the box it leaves and enters
+        box = None if box_x is None else (box_x, box_y)
+        if box != self._hover:
+            if self._hover is not None:
+                self._dirty.add(self._hover)
+            if box is not None:
+                self._dirty.add(box)
+            self._hover = box
+
+    def set_hint(self, box):
+        # Outline the suggested box (flat index), or clear it with None
+        box = None if box is None else divmod(box, FIELDHEIGHT)
+        if box != self._hint:
+            for old_or_new in (self._hint, box):
+                if old_or_new is not None:
+                    self._dirty.add(old_or_new)
+            self._hint = box
+
+    def set_heatmap(self, probabilities):
+        # Show a mine probability per box over the covers (None hides it);
+        # it changes everywhere at once, so the board is rebuilt
+        self._heat = probabilities
+        self._rebuild = True
+
+    def render(self, target, minefield, full=False):
+        # Bring the board surface up to date, copy the changed parts to the
+        # target and return the rects that were touched. Moving or zooming
+        # the camera redraws the whole view.
+        view_rect = getViewRect()
+        if self._view != CAMERA.get_state():
+            self._view = CAMERA.get_state()
+            self._rebuild = True
+        if self._rebuild:
+            self._surface.fill(BGCOLOR)
+            pygame.draw.rect(self._surface, FIELDCOLOR, getFieldRect())
+            self._surface.set_clip(view_rect)
+            if CAMERA.pitch >= TILE_MIN_PITCH:
+                drawBoardTiles(self._surface, minefield, self._heat)
+            else:
+                drawBoardPixels(self._surface, minefield, self._heat)
+            self._surface.set_clip(None)
+            self._rebuild = False
+            self._dirty.clear()
+            full = True
+        rects = []
+        if full:
+            field_rect = getFieldRect()
+            target.blit(self._surface, field_rect, field_rect)
+            rects.append(field_rect)
+        self._surface.set_clip(view_rect)
+        for box_x, box_y in self._dirty:
+            probability = None if self._heat is None else self._heat[box_x * FIELDHEIGHT + box_y]
+            rect = drawTile(self._surface, minefield.get_cell(box_x, box_y), box_x, box_y, probability).clip(view_rect)
+            if rect:
+                target.blit(self._surface, rect, rect)
+                rects.append(rect)
+        self._surface.set_clip(None)
+        self._dirty.clear()
+        if self._hint is not None:
+            highlightBox(*self._hint, HINTCOLOR)
+        if self._hover is not None and not minefield.get_cell(*self._hover) & CELL_REVEALED:
+            highlightBox(*self._hover)
+        return rects
 
 # ===================== Define pause menu overlay and best time drawing =====================
 
-def drawPauseMenu(paused_elapsed_seconds, score_manager):
-    overlay = pygame.Surface((WINDOWWIDTH, WINDOWHEIGHT))
-    overlay.set_alpha(220)
-    overlay.fill((50, 50, 50))
-    DISPLAYSURFACE.blit(overlay, (0, 0))
+def drawPauseMenu(surface, paused_elapsed_seconds, best_times, best_rates=None):
+    # Draw the pause menu text (the shaded backdrop is drawn by PauseOverlay)
 
     # Format pause time
     paused_minutes = paused_elapsed_seconds // 60
@@ -193,88 +694,437 @@ def drawPauseMenu(paused_elapsed_seconds, score_manager):
     for line in lines:
         if '\n' in line:
             for subline in line.split('\n'):
-                drawText(subline, BASICFONT, WHITE, DISPLAYSURFACE, WINDOWWIDTH / 2, current_y)
+                drawText(subline, BASICFONT, WHITE, surface, WINDOWWIDTH / 2, current_y)
                 current_y += line_spacing
         else:
-            drawText(line, BASICFONT, WHITE, DISPLAYSURFACE, WINDOWWIDTH / 2, current_y)
+            drawText(line, BASICFONT, WHITE, surface, WINDOWWIDTH / 2, current_y)
             current_y += line_spacing
 
     # Display the best recorded times for each difficulty
-    best_times = score_manager.get_all_best_times()
     for difficulty, time in best_times.items():
         time_text = f"{difficulty}: {time}s" if time is not None else f"{difficulty}: --"
-        drawText(time_text, BASICFONT, WHITE, DISPLAYSURFACE, WINDOWWIDTH / 2, current_y)
+        if best_rates and best_rates.get(difficulty) is not None:
+            time_text += f"  {best_rates[difficulty]:.2f} 3BV/s"
+        drawText(time_text, BASICFONT, WHITE, surface, WINDOWWIDTH / 2, current_y)
         current_y += line_spacing
 
+# ===================== Cached overlays (pause menu and game-over flash) =====================
+
+class PauseOverlay:
+    def __init__(self):
+        # The shaded backdrop never changes, so it is built once
+        self._shade = pygame.Surface((WINDOWWIDTH, WINDOWHEIGHT))
+        self._shade.set_alpha(220)
+        self._shade.fill((50, 50, 50))
+        self._text = pygame.Surface((WINDOWWIDTH, WINDOWHEIGHT), pygame.SRCALPHA)
+        self._key = None
+
+    def draw(self, target, paused_elapsed_seconds, score_manager):
+        # Re-render the menu text only when the difficulty, the paused-at
+        # time or the recorded scores have changed since the last build
+        key = (currentDifficulty, paused_elapsed_seconds, score_manager.get_revision())
+        if key != self._key:
+            self._text.fill((0, 0, 0, 0))
+            drawPauseMenu(self._text, paused_elapsed_seconds, score_manager.get_all_best_times(),
+                          score_manager.get_all_best_rates())
+            self._key = key
+        target.blit(self._shade, (0, 0))
+        target.blit(self._text, (0, 0))
+
+class FlashOverlay:
+    def __init__(self):
+        # One full-window surface reused for every flash frame; only its
+        # color (on win/loss) and its alpha change
+        self._surface = pygame.Surface((WINDOWWIDTH, WINDOWHEIGHT))
+        self._color = None
+
+    def draw(self, target, color, alpha):
+        if color != self._color:
+            self._surface.fill(color)
+            self._color = color
+        self._surface.set_alpha(alpha)
+        target.blit(self._surface, (0, 0))
+
+# ===================== Frame profiler (F3 overlay, F4 trace export) =====================
+
+class FrameProfiler:
+    def __init__(self):
+        # Time spent in each stage of every frame. Nothing is measured until
+        # the profiler is first switched on, and now()/add() are close to
+        # free while it is off, so the engine can call them unconditionally.
+        self.enabled = False
+        self.visible = False
+        self._columns = PROFILE_STAGES + PROFILE_ENGINE
+        self._frames = collections.deque(maxlen=PROFILE_TRACE_FRAMES)
+        self._recent = collections.deque(maxlen=PROFILE_WINDOW)
+        self._current = dict.fromkeys(self._columns, 0.0)
+        self._origin = None
+        self._frame_start = None
+        self._surface = None
+        self._font = None
+
+    def toggle(self):
+        # Show or hide the overlay; timings keep being collected once started
+        self.visible = not self.visible
+        if not self.enabled:
+            self.enabled = True
+            self._origin = time.perf_counter()
+
+    def now(self):
+        return time.perf_counter() if self.enabled else 0.0
+
+    def add(self, stage, started):
+        # Charge the time since started (from now()) to a stage
+        if self.enabled:
+            self._current[stage] += time.perf_counter() - started
+
+    def begin_frame(self):
+        # Called once the frame's events are in, so idle waiting is not counted
+        if self.enabled:
+            self._frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if not self.enabled or self._frame_start is None:
+            return
+        end = time.perf_counter()
+        frame = (self._frame_start - self._origin, end - self._frame_start) + tuple(self._current.values())
+        self._frames.append(frame)
+        self._recent.append(frame)
+        self._current = dict.fromkeys(self._columns, 0.0)
+        self._frame_start = None
+
+    def get_summary(self):
+        # (p50, p99, bucket counts, mean per column) over the recent frames, in ms
+        recent = np.array(self._recent).reshape(-1, 2 + len(self._columns)) * 1000
+        if not len(recent):
+            return 0.0, 0.0, [0] * len(PROFILE_BUCKETS), dict.fromkeys(self._columns, 0.0)
+        p50, p99 = np.percentile(recent[:, 1], (50, 99))
+        buckets = np.bincount(np.searchsorted(PROFILE_BUCKETS, recent[:, 1]), minlength=len(PROFILE_BUCKETS))
+        means = dict(zip(self._columns, recent[:, 2:].mean(axis=0)))
+        return p50, p99, buckets[:len(PROFILE_BUCKETS)].tolist(), means
+
+    def draw(self, target):
+        # Overlay in the top-right corner of the board: percentiles, mean
+        # time per stage and a histogram of recent frame times. Returns the
+        # rect it covers.
+        if self._surface is None:
+            self._surface = pygame.Surface((250, 200))
+            self._font = loadFont(13)
+        p50, p99, buckets, means = self.get_summary()
+        surface = self._surface
+        surface.fill(BLACK)
+        lines = [f"frame  p50 {p50:5.2f}  p99 {p99:5.2f} ms"]
+        lines += [f"{column:<9} {means[column]:6.3f} ms" for column in self._columns]
+        for row, line in enumerate(lines):
+            surface.blit(self._font.render(line, True, WHITE), (6, 4 + row * 14))
+        # One bar per bucket, scaled to the fullest one
+        top = 4 + len(lines) * 14 + 4
+        bar_width = (surface.get_width() - 12) // len(buckets)
+        tallest = max(max(buckets), 1)
+        for column, count in enumerate(buckets):
+            height = round(count / tallest * (surface.get_height() - top - 18))
+            x = 6 + column * bar_width
+            pygame.draw.rect(surface, GREEN, (x, surface.get_height() - 16 - height, bar_width - 2, height))
+            edge = PROFILE_BUCKETS[column]
+            label = f"{edge}" if edge != math.inf else "+"
+            surface.blit(renderText(label, self._font, WHITE), (x, surface.get_height() - 14))
+        rect = surface.get_rect(topright=getViewRect().topright)
+        target.blit(surface, rect)
+        return rect
+
+    def export(self, filename):
+        # Every recorded frame as CSV, or as JSON when the name ends in .json.
+        # Times in milliseconds; engine columns are part of the stage that
+        # made the move, not extra time.
+        columns = ('start', 'frame') + self._columns
+        rows = [[round(value * 1000, 4) for value in frame] for frame in self._frames]
+        if filename.lower().endswith('.json'):
+            data = json.dumps({'columns': columns, 'frames': rows})
+        else:
+            data = '\n'.join(','.join(map(str, row)) for row in [columns] + rows) + '\n'
+        writeFileAtomically(filename, data)
+        return len(rows)
+
+PROFILER = FrameProfiler()
+
 # ===================== ScoreManager: Tracks and saves best times =====================
 
+def writeFileAtomically(filename, data):
+    # Write text or bytes to a temporary file and rename it over the target,
+    # so readers only ever see the old contents or the complete new ones
+    temporary = filename + '.tmp'
+    with open(temporary, 'wb' if isinstance(data, (bytes, bytearray)) else 'w') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, filename)
+
 class ScoreManager:
-    def __init__(self, filename='wins.json'):
-        # Initialize ScoreManager with a file to load/save best times
+    def __init__(self, filename='wins.jsonl', legacy_filename='wins.json', load=True):
+        # Scores live in an append-only journal, one JSON object per line.
+        # Only sorted lists of times (and of 3BV/s, for wins that have it)
+        # per difficulty are kept in memory, so best times and leaderboards
+        # never scan the history. A checkpoint of those lists lets startup
+        # skip the lines it already covers.
         self._filename = filename
-        self._cache = self.load_scores()
+        self._checkpoint = filename + '.index'
+        self._legacy_filename = legacy_filename
+        self._times = None # Difficulty -> every recorded time, ascending
+        self._rates = {} # Difficulty -> every recorded 3BV/s, ascending
+        self._revision = 0 # Bumped on every saved score so views know to refresh
+        # With load=False the journal is read on first use (or ensure_loaded)
+        if load:
+            self.load_scores()
+
+    def ensure_loaded(self):
+        if self._times is None:
+            self.load_scores()
+        return self._times
 
     def load_scores(self):
-        # Load score data from JSON file if it exists
-        if os.path.exists(self._filename):
-            with open(self._filename, 'r') as f:
-                return json.load(f)
-        return []
-
-    def save_score(self, difficulty, time_seconds):
-        # Save a new time for the given difficulty and write to file
-        self._cache.append({'difficulty': difficulty, 'time': time_seconds})
-        with open(self._filename, 'w') as f:
-            json.dump(self._cache, f)
+        # Read the checkpoint, then only the journal lines written after it.
+        # The old wins.json list is moved over first if there is no journal.
+        if not os.path.exists(self._filename) and self._legacy_filename and os.path.exists(self._legacy_filename):
+            self._migrate()
+        self._times = {}
+        self._rates = {}
+        if not os.path.exists(self._filename):
+            return
+        offset = 0
+        if os.path.exists(self._checkpoint):
+            with open(self._checkpoint, 'r') as f:
+                checkpoint = json.load(f)
+            # Checkpoints from before 3BV was recorded are rebuilt
+            if checkpoint['offset'] <= os.path.getsize(self._filename) and 'rates' in checkpoint:
+                offset = checkpoint['offset']
+                self._times = checkpoint['times']
+                self._rates = checkpoint['rates']
+        with open(self._filename, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        # Only whole lines count: a write cut short stays unread
+        data = data[:data.rfind(b'\n') + 1]
+        lines = [line for line in data.decode().split('\n') if line.strip()]
+        for entry in self._parse_lines(lines):
+            self._times.setdefault(entry['difficulty'], []).append(entry['time'])
+            if '3bv_s' in entry:
+                self._rates.setdefault(entry['difficulty'], []).append(entry['3bv_s'])
+        for values in list(self._times.values()) + list(self._rates.values()):
+            values.sort()
+        if len(lines) >= SCORE_CHECKPOINT_LINES:
+            self._write_checkpoint(offset + len(data))
+
+    def _parse_lines(self, lines):
+        try:
+            # One parse for all lines is much faster than one per line
+            return json.loads('[' + ','.join(lines) + ']')
+        except ValueError:
+            # A damaged line (e.g. from a power loss) is skipped
+            entries = []
+            for line in lines:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    pass
+            return entries
+
+    def _write_checkpoint(self, offset):
+        # Sorted times plus how much of the journal they cover, replaced
+        # atomically so a crash leaves the old checkpoint or the new one
+        writeFileAtomically(self._checkpoint, json.dumps({'offset': offset, 'times': self._times, 'rates': self._rates}))
+
+    def _migrate(self):
+        # Write the journal next to the old file and rename it into place,
+        # so a crash never leaves a half-written journal behind
+        with open(self._legacy_filename, 'r') as f:
+            entries = json.load(f)
+        writeFileAtomically(self._filename, ''.join(json.dumps(entry) + '\n' for entry in entries))
+
+    def save_score(self, difficulty, time_seconds, details=None):
+        # Append one line with a single write to the end of the journal;
+        # details (3BV, 3BV/s, the board) are stored in the same line.
+        # Scores are loaded first so the new line is not read back twice.
+        times = self.ensure_loaded()
+        line = json.dumps({'difficulty': difficulty, 'time': time_seconds, **(details or {})}) + '\n'
+        fd = os.open(self._filename, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            # A line cut short by a crash is ended first, so it is skipped
+            # on its own instead of swallowing this one
+            size = os.fstat(fd).st_size
+            if size and os.pread(fd, 1, size - 1) != b'\n':
+                line = '\n' + line
+            os.write(fd, line.encode())
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        bisect.insort(times.setdefault(difficulty, []), time_seconds)
+        if details and '3bv_s' in details:
+            bisect.insort(self._rates.setdefault(difficulty, []), details['3bv_s'])
+        self._revision += 1
 
     def get_best_time(self, difficulty):
         # Return the best (lowest) time for the given difficulty
-        times = [entry['time'] for entry in self._cache if entry['difficulty'] == difficulty]
-        return min(times) if times else None
+        times = self.ensure_loaded().get(difficulty)
+        return times[0] if times else None
+
+    def get_top_times(self, difficulty, count=10):
+        # Leaderboard: the count best times for the difficulty, best first
+        return self.ensure_loaded().get(difficulty, [])[:count]
+
+    def get_best_rate(self, difficulty):
+        # Highest 3BV/s for the difficulty: speed that does not depend on
+        # how many clicks the board happened to need
+        self.ensure_loaded()
+        rates = self._rates.get(difficulty)
+        return rates[-1] if rates else None
+
+    def get_top_rates(self, difficulty, count=10):
+        # Leaderboard by 3BV/s, best first
+        self.ensure_loaded()
+        return self._rates.get(difficulty, [])[::-1][:count]
+
+    def get_game_count(self, difficulty):
+        return len(self.ensure_loaded().get(difficulty, []))
+
+    def get_revision(self):
+        return self._revision
 
     def get_all_best_times(self):
         # Return best times for all difficulties as a dictionary
         difficulties = ['VERY EASY', 'EASY', 'NORMAL', 'HARD']
         return {d: self.get_best_time(d) for d in difficulties}
 
+    def get_all_best_rates(self):
+        return {d: self.get_best_rate(d) for d in self.get_all_best_times()}
+
 # ===================== Minefield logic and operations =====================
 
+def countNeighbors(mask):
+    # For every box, how many of its 8 neighbors are set in the boolean mask.
+    # The board is the last two axes, so a stack of boards works too.
+    width, height = mask.shape[-2:]
+    padded = np.zeros(mask.shape[:-2] + (width + 2, height + 2), dtype=np.uint8)
+    padded[..., 1:-1, 1:-1] = mask
+    counts = np.zeros(mask.shape, dtype=np.uint8)
+    for dx in (0, 1, 2):
+        for dy in (0, 1, 2):
+            if dx != 1 or dy != 1:
+                counts += padded[..., dx:dx + width, dy:dy + height]
+    return counts
+
+
+def dilate(mask):
+    # Grow a boolean mask by one box in all 8 directions (last two axes)
+    grown = mask.copy()
+    grown[..., 1:, :] |= mask[..., :-1, :]
+    grown[..., :-1, :] |= mask[..., 1:, :]
+    wide = grown.copy()
+    wide[..., :, 1:] |= grown[..., :, :-1]
+    wide[..., :, :-1] |= grown[..., :, 1:]
+    return wide
+
+
+class _GridView:
+    # Read-mostly [x][y] view over the packed cell bytes, kept for code that
+    # still indexes the field or revealed grid like the old lists of lists
+    def __init__(self, minefield, decode, encode=None):
+        self._minefield = minefield
+        self._decode = decode
+        self._encode = encode
+
+    def __len__(self):
+        return self._minefield.get_width()
+
+    def __getitem__(self, x):
+        return _ColumnView(self, x)
+
+
+class _ColumnView:
+    def __init__(self, grid, x):
+        self._grid = grid
+        self._base = x * grid._minefield.get_height()
+
+    def __len__(self):
+        return self._grid._minefield.get_height()
+
+    def __getitem__(self, y):
+        return self._grid._decode(self._grid._minefield._cells[self._base + y])
+
+    def __setitem__(self, y, value):
+        if self._grid._encode is None:
+            raise TypeError('This view is read-only')
+        self._grid._encode(self._base + y, value)
+
+
+def _decode_field(cell):
+    # Turn a packed cell byte back into the legacy '[X]' / '[3]' string
+    if cell & CELL_MINE:
+        return '[X]'
+    return '[' + str(cell & CELL_COUNT_MASK) + ']'
+
+
+def _decode_revealed(cell):
+    return bool(cell & CELL_REVEALED)
+
+
 class Minefield:
-    def __init__(self, width, height, mine_count):
+    def __init__(self, width, height, mine_count, seed=None, first_click_safe=False):
         # Initialize minefield dimensions and mine count
         self._width = width
         self._height = height
         self._mine_count = mine_count
-        self._field = self.create_blank_field()
-        self._revealed = [[False] * height for _ in range(width)] # Tracking revealed boxes
-        self._marked = [] # List of marked boxes
-        self._zero_reveal_queue = [] # Queue for recursive zero reveals
-        # Generate the field
-        self.place_mines()
+        self._seed = seed
+        self._rng = np.random.default_rng(seed)
+        # One byte per box, indexed x * height + y: the low nibble holds the
+        # neighbor count and the high bits hold the mine/revealed/flag state
+        self._cells = bytearray(width * height)
+        # Writable (width, height) NumPy view sharing the same bytes
+        self._grid = np.frombuffer(self._cells, dtype=np.uint8).reshape(width, height)
+        # Running counters so win checks and the HUD never scan the grid
+        self._safe_total = width * height - mine_count
+        self._revealed_safe = 0
+        self._flags = set() # Flat index of every flagged box (mirrors CELL_FLAGGED)
+        self._mine_indices = np.empty(0, dtype=np.intp) # Flat index of every mine
+        # Box the mines were placed around on first-click-safe boards
+        self._safe_start = None
+        self._mines_placed = False
+        # Generate the field now, or at the first reveal on first-click-safe boards
+        if not first_click_safe:
+            self.place_mines()
+            self.place_numbers()
+
+    def index(self, x, y):
+        # Flat position of a box inside the packed cell array
+        return x * self._height + y
+
+    def place_mines(self, exclude=()):
+        # Pick every mine position at once, sampling boxes without replacement.
+        # Boxes in exclude (sorted flat indices) are skipped by drawing from
+        # the remaining boxes and shifting each draw past the excluded ones.
+        exclude = np.asarray(exclude, dtype=np.intp)
+        positions = self._rng.choice(self._width * self._height - len(exclude), self._mine_count, replace=False)
+        positions += np.searchsorted(exclude - np.arange(len(exclude)), positions, side='right')
+        self._grid.reshape(-1)[positions] |= CELL_MINE
+        self._mine_indices = np.sort(positions).astype(np.intp)
+        self._mines_placed = True
+
+    def place_mines_around(self, i):
+        # First-click-safe placement: box i and its neighbors stay clear,
+        # or just box i when the board is too crowded for that
+        exclude = sorted([i] + self.neighbor_indices(i))
+        if len(exclude) > self._width * self._height - self._mine_count:
+            exclude = [i]
+        self._safe_start = i
+        self.place_mines(exclude)
         self.place_numbers()
 
-    def create_blank_field(self):
-        # Create a blank field with placeholder values
-        return [['[ ]' for _ in range(self._height)] for _ in range(self._width)]
-
-    def place_mines(self):
-        # Randomly place mines in the field
-        placed = 0
-        while placed < self._mine_count:
-            x = random.randint(0, self._width - 1)
-            y = random.randint(0, self._height - 1)
-            if self._field[x][y] != '[X]':
-                self._field[x][y] = '[X]'
-                placed += 1
-
     def place_numbers(self):
-        # Add number hints based on nearby mines
-        for x in range(self._width):
-            for y in range(self._height):
-                if self._field[x][y] != '[X]':
-                    count = sum(1 for nx, ny in self.get_neighbors(x, y)
-                                if self._field[nx][ny] == '[X]')
-                    self._field[x][y] = f'[{count}]'
+        # Add number hints by summing the mine mask shifted in all 8 directions
+        mines = (self._grid & CELL_MINE).astype(bool)
+        counts = countNeighbors(mines)
+        counts[mines] = 0
+        self._grid &= ~CELL_COUNT_MASK & 0xFF
+        self._grid |= counts
 
     def get_neighbors(self, x, y):
         # Get all valid neighboring box coordinates (8 directions)
@@ -289,37 +1139,209 @@ class Minefield:
         return neighbors
 
     def reveal(self, x, y):
-        # Reveal a box, and recursively reveal zeros if needed
-        if self._revealed[x][y]:
-            return
-        self._revealed[x][y] = True
-        if self._field[x][y] == '[0]':
-            self.reveal_zeros(x, y)
+        # Reveal a box, and recursively reveal zeros if needed.
+        # Returns the flat indices of every box this call uncovered.
+        return self.reveal_cells([self.index(x, y)])
+
+    def reveal_cells(self, indices):
+        # Reveal several boxes in one batch and flood out from any zeros
+        if not self._mines_placed and len(indices):
+            self.place_mines_around(int(indices[0]))
+        cells = self._cells
+        opened = []
+        zeros = []
+        mines_hit = 0
+        for i in indices:
+            if not cells[i] & CELL_REVEALED:
+                cells[i] |= CELL_REVEALED
+                opened.append(i)
+                if cells[i] & CELL_MINE:
+                    mines_hit += 1
+                elif not cells[i] & CELL_COUNT_MASK:
+                    zeros.append(i)
+        opened = np.array(opened, dtype=np.intp)
+        if zeros:
+            opened = np.concatenate((opened, self._flood(zeros)))
+        if self._flags:
+            self._clear_flags(opened)
+        # The flood never crosses a mine, so only directly revealed boxes can be mines
+        self._revealed_safe += len(opened) - mines_hit
+        return opened
 
     def reveal_zeros(self, x, y):
-        # Recursive reveal for blank areas
-        self._zero_reveal_queue.append((x, y))
-        seen = set(self._zero_reveal_queue)
-        while self._zero_reveal_queue:
-            cx, cy = self._zero_reveal_queue.pop(0)
-            for nx, ny in self.get_neighbors(cx, cy):
-                if not self._revealed[nx][ny]:
-                    self._revealed[nx][ny] = True
-                    if self._field[nx][ny] == '[0]' and (nx, ny) not in seen:
-                        self._zero_reveal_queue.append((nx, ny))
-                        seen.add((nx, ny))
+        # Open the blank area around an already revealed zero box
+        opened = self._flood([self.index(x, y)])
+        if self._flags:
+            self._clear_flags(opened)
+        self._revealed_safe += len(opened)
+        return opened
+
+    def _clear_flags(self, opened):
+        # A box loses its flag once it is revealed
+        flat = self._grid.reshape(-1)
+        flagged = opened[(flat[opened] & CELL_FLAGGED) != 0]
+        if len(flagged):
+            flat[flagged] &= ~CELL_FLAGGED & 0xFF
+            self._flags.difference_update(flagged.tolist())
+
+    def _flood(self, frontier):
+        # Breadth-first flood fill, one ring of zeros at a time. Every box is
+        # visited once, so the cost is linear in the size of the opened area.
+        # Small rings are walked in plain Python, wide rings with NumPy.
+        cells = self._cells
+        flat = self._grid.reshape(-1)
+        width, height = self._width, self._height
+        opened = []
+        while len(frontier):
+            if len(frontier) < FLOOD_VECTOR_MIN:
+                found = []
+                next_frontier = []
+                for i in frontier:
+                    x, y = divmod(int(i), height)
+                    for dx, dy in NEIGHBOR_OFFSETS:
+                        nx, ny = x + dx, y + dy
+                        if 0 <= nx < width and 0 <= ny < height:
+                            j = i + dx * height + dy
+                            if not cells[j] & CELL_REVEALED:
+                                cells[j] |= CELL_REVEALED
+                                found.append(j)
+                                if not cells[j] & (CELL_MINE | CELL_COUNT_MASK):
+                                    next_frontier.append(j)
+                opened.append(np.array(found, dtype=np.intp))
+                frontier = next_frontier
+            else:
+                ring = np.asarray(frontier, dtype=np.intp)
+                xs, ys = np.divmod(ring, height)
+                candidates = []
+                for dx, dy in NEIGHBOR_OFFSETS:
+                    inside = (xs + dx >= 0) & (xs + dx < width) & (ys + dy >= 0) & (ys + dy < height)
+                    candidates.append(ring[inside] + (dx * height + dy))
+                found = np.concatenate(candidates)
+                found = found[(flat[found] & CELL_REVEALED) == 0]
+                found.sort()
+                found = found[np.diff(found, prepend=-1) != 0]
+                flat[found] |= CELL_REVEALED
+                opened.append(found)
+                frontier = found[(flat[found] & (CELL_MINE | CELL_COUNT_MASK)) == 0]
+        if not opened:
+            return NO_CHANGES
+        return np.concatenate(opened)
+
+    def cover_all(self):
+        # Cover every box again, keeping the mines (used after a board was test-solved)
+        self._grid &= ~CELL_REVEALED & 0xFF
+        self._revealed_safe = 0
 
     def all_safe_revealed(self):
         # Check if all non-mine tiles are revealed
-        safe = self._width * self._height - self._mine_count
-        count = sum(1 for x in range(self._width)
-                    for y in range(self._height)
-                    if self._revealed[x][y] and self._field[x][y] != '[X]')
-        return count == safe
+        return self._revealed_safe == self._safe_total
+
+    def reveal_all_mines(self):
+        # Uncover every mine (end of game), touching only the mine boxes
+        self._grid.reshape(-1)[self._mine_indices] |= CELL_REVEALED
+        return self._mine_indices
 
     def is_mine(self, x, y):
         # Check if a tile is a mine
-        return self._field[x][y] == '[X]'
+        return bool(self._cells[self.index(x, y)] & CELL_MINE)
+
+    def is_revealed(self, x, y):
+        return bool(self._cells[self.index(x, y)] & CELL_REVEALED)
+
+    def is_flagged(self, x, y):
+        return bool(self._cells[self.index(x, y)] & CELL_FLAGGED)
+
+    def get_number(self, x, y):
+        # Number of mines touching the box (meaningless for a mine)
+        return self._cells[self.index(x, y)] & CELL_COUNT_MASK
+
+    def set_revealed(self, x, y, value=True):
+        self._set_revealed_at(self.index(x, y), value)
+
+    def _set_revealed_at(self, i, value):
+        cell = self._cells[i]
+        if bool(cell & CELL_REVEALED) == bool(value):
+            return
+        if not cell & CELL_MINE:
+            self._revealed_safe += 1 if value else -1
+        if value and cell & CELL_FLAGGED:
+            self._flags.discard(i)
+            cell ^= CELL_FLAGGED
+        self._cells[i] = cell ^ CELL_REVEALED
+
+    def toggle_flag(self, x, y):
+        # Mark or unmark a covered box, returns the new flag state
+        i = self.index(x, y)
+        if self._cells[i] & CELL_REVEALED:
+            return False
+        self._cells[i] ^= CELL_FLAGGED
+        if self._cells[i] & CELL_FLAGGED:
+            self._flags.add(i)
+            return True
+        self._flags.discard(i)
+        return False
+
+    def chord(self, x, y):
+        # Reveal every unflagged neighbor of a revealed number once the
+        # number of flags around it matches the number. Returns the boxes
+        # uncovered, empty if the number is not satisfied.
+        cells = self._cells
+        i = self.index(x, y)
+        cell = cells[i]
+        number = cell & CELL_COUNT_MASK
+        if not cell & CELL_REVEALED or cell & CELL_MINE or not number:
+            return NO_CHANGES
+        flagged = 0
+        covered = []
+        for dx, dy in NEIGHBOR_OFFSETS:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < self._width and 0 <= ny < self._height:
+                j = i + dx * self._height + dy
+                if cells[j] & CELL_REVEALED:
+                    continue
+                if cells[j] & CELL_FLAGGED:
+                    flagged += 1
+                else:
+                    covered.append(j)
+        if flagged != number:
+            return NO_CHANGES
+        return self.reveal_cells(covered)
+
+    def neighbor_indices(self, i):
+        # Flat indices of the boxes around flat index i
+        x, y = divmod(i, self._height)
+        return [i + dx * self._height + dy for dx, dy in NEIGHBOR_OFFSETS
+                if 0 <= x + dx < self._width and 0 <= y + dy < self._height]
+
+    def contains_mine(self, indices):
+        # True if any of the given flat indices is a mine
+        if not len(indices):
+            return False
+        return bool((self._grid.reshape(-1)[indices] & CELL_MINE).any())
+
+    def get_coords(self, indices):
+        # Split flat indices (as returned by reveal) into x and y arrays
+        return np.divmod(np.asarray(indices), self._height)
+
+    def get_revealed_count(self):
+        # Number of safe boxes uncovered so far
+        return self._revealed_safe
+
+    def get_flag_count(self):
+        return len(self._flags)
+
+    def get_mine_count(self):
+        return self._mine_count
+
+    def get_seed(self):
+        return self._seed
+
+    def get_safe_start(self):
+        # Box that is known to be safe, or None until one is chosen
+        return self._safe_start
+
+    def get_mine_indices(self):
+        return self._mine_indices
 
     def get_width(self):
         return self._width
@@ -327,25 +1349,319 @@ class Minefield:
     def get_height(self):
         return self._height
 
+    def get_cells(self):
+        return self._cells
+
+    def get_grid(self):
+        # (width, height) uint8 array view of the packed cells
+        return self._grid
+
+    def get_cell(self, x, y):
+        return self._cells[x * self._height + y]
+
+    def is_placed(self):
+        # False on a first-click-safe board until the first reveal
+        return self._mines_placed
+
+    def get_planes(self):
+        # Mine, revealed and flag bitmaps, each packed eight boxes to a byte
+        flat = self._grid.reshape(-1)
+        return [np.packbits((flat & bit) != 0) for bit in (CELL_MINE, CELL_REVEALED, CELL_FLAGGED)]
+
+    @classmethod
+    def from_planes(cls, width, height, mine_count, planes, placed=True, safe_start=None, seed=None):
+        # Rebuild a minefield from get_planes() output (any buffer, e.g. a
+        # memory map); the neighbor counts are worked out again from the mines
+        minefield = cls(width, height, mine_count, seed, first_click_safe=True)
+        count = width * height
+        mines, revealed, flagged = (np.unpackbits(np.asarray(plane, dtype=np.uint8), count=count).view(bool)
+                                    for plane in planes)
+        grid = minefield._grid
+        mine_grid = mines.reshape(width, height)
+        grid[...] = np.where(mine_grid, np.uint8(CELL_MINE), countNeighbors(mine_grid))
+        grid |= (revealed.view(np.uint8) * np.uint8(CELL_REVEALED)).reshape(width, height)
+        if flagged.any():
+            grid |= (flagged.view(np.uint8) * np.uint8(CELL_FLAGGED)).reshape(width, height)
+            minefield._flags = set(np.flatnonzero(flagged).tolist())
+        if placed:
+            minefield._mine_indices = np.flatnonzero(mines)
+            minefield._mines_placed = True
+        minefield._safe_start = safe_start
+        minefield._revealed_safe = int(np.count_nonzero(revealed & ~mines))
+        return minefield
+
+    def get_block(self, left, top, width, height):
+        # Copy of the packed bytes of a (width, height) rectangle of boxes
+        return self._grid[left:left + width, top:top + height].copy()
+
     def get_field(self):
-        return self._field
+        # Compatibility view: field[x][y] gives '[X]' or '[n]'
+        return _GridView(self, _decode_field)
 
     def get_revealed(self):
-        return self._revealed
+        # Compatibility view: revealed[x][y] gives (and sets) the revealed state
+        return _GridView(self, _decode_revealed, self._set_revealed_at)
 
     def get_marked(self):
-        return self._marked
+        # Flagged boxes as [x, y] pairs
+        return [[i // self._height, i % self._height] for i in sorted(self._flags)]
+
+# ===================== Endless board: chunks generated from the seed on demand =====================
+
+def _zigzag(n):
+    # Map any integer to a distinct non-negative one (seed entropy must be >= 0)
+    return 2 * n if n >= 0 else -2 * n - 1
+
+class ChunkedMinefield:
+    def __init__(self, density=ENDLESS_DENSITY, seed=None, chunk_size=CHUNK_SIZE, cache_size=CHUNK_CACHE_SIZE):
+        # A board with no edges. Boxes use unbounded (x, y) coordinates and
+        # the same packed bytes as Minefield. Each chunk's mines follow from
+        # (seed, chunk x, chunk y) alone, so a chunk is generated the first
+        # time something looks at it and can be dropped and rebuilt later.
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+        self._seed = seed
+        self._size = chunk_size
+        self._chunk_mines = int(round(density * chunk_size * chunk_size))
+        # (cx, cy) -> bytes holding the mine bit and neighbor count of every
+        # box, indexed local x * chunk_size + local y, least recently used first
+        self._derived = collections.OrderedDict()
+        self._cache_size = cache_size
+        # (cx, cy) -> bytearray of revealed/flag bits, kept for every chunk
+        # the player touched, so memory grows with the explored area only
+        self._state = {}
+        self._revealed_safe = 0
+        self._flags = 0
+        self._mines_hit = 0
+        # Opened zeros a flood stopped at the limit before looking around
+        self._unfinished = []
+
+    def _mine_mask(self, cx, cy):
+        # Boolean (chunk_size, chunk_size) mask of the mines in one chunk
+        size = self._size
+        rng = np.random.default_rng([self._seed, _zigzag(cx), _zigzag(cy)])
+        mask = np.zeros(size * size, dtype=bool)
+        mask[rng.choice(size * size, self._chunk_mines, replace=False)] = True
+        return mask.reshape(size, size)
+
+    def _chunk(self, cx, cy):
+        # Mine bits and neighbor counts of one chunk, generated if not cached.
+        # Counts along the edges need the mines of the 8 chunks around it.
+        key = (cx, cy)
+        chunk = self._derived.get(key)
+        if chunk is not None:
+            self._derived.move_to_end(key)
+            return chunk
+        size = self._size
+        block = np.block([[self._mine_mask(cx + dx, cy + dy) for dy in (-1, 0, 1)] for dx in (-1, 0, 1)])
+        mines = block[size:2 * size, size:2 * size]
+        counts = countNeighbors(block)[size:2 * size, size:2 * size]
+        chunk = np.where(mines, CELL_MINE, counts).astype(np.uint8).tobytes()
+        self._derived[key] = chunk
+        if len(self._derived) > self._cache_size:
+            self._derived.popitem(last=False)
+        return chunk
+
+    def _player_state(self, cx, cy):
+        # Revealed/flag bits of one chunk, created the first time it is touched
+        state = self._state.get((cx, cy))
+        if state is None:
+            state = self._state[(cx, cy)] = bytearray(self._size * self._size)
+        return state
+
+    def get_cell(self, x, y):
+        # Packed byte of one box, as Minefield.get_cells() would hold it
+        cx, lx = divmod(x, self._size)
+        cy, ly = divmod(y, self._size)
+        i = lx * self._size + ly
+        state = self._state.get((cx, cy))
+        return self._chunk(cx, cy)[i] | (state[i] if state is not None else 0)
+
+    def get_block(self, left, top, width, height):
+        # Packed bytes of a (width, height) rectangle of boxes, e.g. the
+        # part of the board on screen. Only the chunks it overlaps are built.
+        size = self._size
+        block = np.empty((width, height), dtype=np.uint8)
+        for cx in range(left // size, (left + width - 1) // size + 1):
+            x0 = max(cx * size, left)
+            x1 = min(cx * size + size, left + width)
+            for cy in range(top // size, (top + height - 1) // size + 1):
+                y0 = max(cy * size, top)
+                y1 = min(cy * size + size, top + height)
+                chunk = np.frombuffer(self._chunk(cx, cy), dtype=np.uint8).reshape(size, size)
+                part = chunk[x0 - cx * size:x1 - cx * size, y0 - cy * size:y1 - cy * size]
+                state = self._state.get((cx, cy))
+                if state is not None:
+                    grid = np.frombuffer(state, dtype=np.uint8).reshape(size, size)
+                    part = part | grid[x0 - cx * size:x1 - cx * size, y0 - cy * size:y1 - cy * size]
+                block[x0 - left:x1 - left, y0 - top:y1 - top] = part
+        return block
+
+    def index(self, x, y):
+        # Boxes are named by their coordinates, there is no flat index
+        return (x, y)
+
+    def reveal(self, x, y):
+        # Reveal a box and flood out from zeros, crossing chunk borders.
+        # Clicking an opened blank box carries on a flood that hit the limit.
+        # Returns an (n, 2) array with the (x, y) of every box uncovered.
+        return np.array(self._reveal(x, y), dtype=np.intp).reshape(-1, 2)
+
+    def _reveal(self, x, y):
+        cell = self.get_cell(x, y)
+        if cell & CELL_REVEALED:
+            if cell & (CELL_MINE | CELL_COUNT_MASK):
+                return []
+            frontier, self._unfinished = self._unfinished, []
+            return self._flood(frontier, [])
+        self._set_revealed(x, y)
+        if cell & CELL_MINE:
+            self._mines_hit += 1
+            return [(x, y)]
+        self._revealed_safe += 1
+        if cell & CELL_COUNT_MASK:
+            return [(x, y)]
+        return self._flood([(x, y)], [(x, y)])
+
+    def _set_revealed(self, x, y):
+        cx, lx = divmod(x, self._size)
+        cy, ly = divmod(y, self._size)
+        self._open(self._player_state(cx, cy), lx * self._size + ly)
+
+    def _open(self, state, i):
+        # Reveal one box of a chunk's state, dropping its flag
+        if state[i] & CELL_FLAGGED:
+            self._flags -= 1
+        state[i] = state[i] & ~CELL_FLAGGED | CELL_REVEALED
+
+    def _flood(self, frontier, opened):
+        # Breadth-first flood over unbounded coordinates. Chunks are looked
+        # up once per box through a small local table, not per neighbor test.
+        size = self._size
+        chunks = {}
+        def lookup(x, y):
+            cx, lx = divmod(x, size)
+            cy, ly = divmod(y, size)
+            pair = chunks.get((cx, cy))
+            if pair is None:
+                pair = chunks[(cx, cy)] = (self._chunk(cx, cy), self._player_state(cx, cy))
+            return pair[0], pair[1], lx * size + ly
+        frontier = collections.deque(frontier)
+        while frontier and len(opened) < ENDLESS_FLOOD_LIMIT:
+            x, y = frontier.popleft()
+            for dx, dy in NEIGHBOR_OFFSETS:
+                nx, ny = x + dx, y + dy
+                derived, state, i = lookup(nx, ny)
+                if not state[i] & CELL_REVEALED:
+                    self._open(state, i)
+                    opened.append((nx, ny))
+                    # A zero never touches a mine, so nothing opened here is one
+                    self._revealed_safe += 1
+                    if not derived[i] & CELL_COUNT_MASK:
+                        frontier.append((nx, ny))
+        self._unfinished.extend(frontier)
+        return opened
+
+    def toggle_flag(self, x, y):
+        # Mark or unmark a covered box, returns the new flag state
+        cx, lx = divmod(x, self._size)
+        cy, ly = divmod(y, self._size)
+        state = self._player_state(cx, cy)
+        i = lx * self._size + ly
+        if state[i] & CELL_REVEALED:
+            return False
+        state[i] ^= CELL_FLAGGED
+        if state[i] & CELL_FLAGGED:
+            self._flags += 1
+            return True
+        self._flags -= 1
+        return False
+
+    def chord(self, x, y):
+        # Reveal the unflagged neighbors of a revealed number whose flags
+        # match it. Returns the (x, y) uncovered, empty if not satisfied.
+        # A revealed blank box carries on a flood that hit the limit.
+        cell = self.get_cell(x, y)
+        if cell & CELL_REVEALED and not cell & (CELL_MINE | CELL_COUNT_MASK):
+            return self.reveal(x, y)
+        number = cell & CELL_COUNT_MASK
+        opened = []
+        if cell & CELL_REVEALED and not cell & CELL_MINE and number:
+            around = [(x + dx, y + dy) for dx, dy in NEIGHBOR_OFFSETS]
+            cells = [self.get_cell(nx, ny) for nx, ny in around]
+            if sum(1 for c in cells if c & (CELL_REVEALED | CELL_FLAGGED) == CELL_FLAGGED) == number:
+                for (nx, ny), c in zip(around, cells):
+                    if not c & (CELL_REVEALED | CELL_FLAGGED):
+                        opened += self._reveal(nx, ny)
+        return np.array(opened, dtype=np.intp).reshape(-1, 2)
+
+    def contains_mine(self, boxes):
+        # True if any of the (x, y) rows is a mine
+        return any(self.get_cell(x, y) & CELL_MINE for x, y in np.asarray(boxes).reshape(-1, 2).tolist())
+
+    def reveal_all_mines(self):
+        # An endless board has no end: only the mine that was hit is shown
+        return np.empty((0, 2), dtype=np.intp)
+
+    def all_safe_revealed(self):
+        return False
+
+    def get_safe_start(self):
+        return None
+
+    def is_mine(self, x, y):
+        return bool(self.get_cell(x, y) & CELL_MINE)
+
+    def is_revealed(self, x, y):
+        return bool(self.get_cell(x, y) & CELL_REVEALED)
+
+    def is_flagged(self, x, y):
+        return bool(self.get_cell(x, y) & CELL_FLAGGED)
+
+    def get_number(self, x, y):
+        return self.get_cell(x, y) & CELL_COUNT_MASK
+
+    def get_revealed_count(self):
+        # Safe boxes uncovered so far (the score on a board that never ends)
+        return self._revealed_safe
+
+    def get_flag_count(self):
+        return self._flags
+
+    def get_mines_hit(self):
+        return self._mines_hit
+
+    def get_seed(self):
+        return self._seed
+
+    def get_chunk_size(self):
+        return self._size
+
+    def get_explored_chunks(self):
+        # Chunks holding player state (these are never dropped)
+        return len(self._state)
+
+    def get_cached_chunks(self):
+        # Generated chunks currently in memory (bounded by the cache size)
+        return len(self._derived)
 
 # ===================== Game class manages game state and logic =====================
 
 class Game:
-    def __init__(self, width, height, mine_count, score_manager):
-        # Create the minefield with specified parameters
-        self.minefield = Minefield(width, height, mine_count)
-        #Set score manager
+    def __init__(self, width, height, mine_count, score_manager, clock=None, seed=None, difficulty=None,
+                 board=None, first_click_safe=False, recorder=None):
+        # Create the minefield with specified parameters, or play a ready-made one
+        if board is None:
+            board = Minefield(width, height, mine_count, seed, first_click_safe)
+        self.minefield = board
+        #Set score manager (None when running headless and nothing is saved)
         self.score_manager = score_manager
+        self.difficulty = difficulty or currentDifficulty
+        # Millisecond clock, the monotonic getTicks() by default; headless runs pass their own
+        self._clock = clock or getTicks
         # Track game timing and pause status
-        self.start_time = pygame.time.get_ticks()
+        self.created_at = self._clock()
+        self.start_time = self.created_at
         self.paused = False
         self.pause_time = 0
         self.final_time = None
@@ -354,250 +1670,2004 @@ class Game:
         self.game_over = False
         self.win = False
         self.started = False  # Timer doesn't start until first click
-
-
-    def update_timer(self):
-        # Returns 0 if game hasn't started
+        # Optional GameRecorder logging the board and every input
+        self.recorder = recorder
+        if recorder is not None:
+            recorder.start(self)
+
+    def update_timer(self, now=None):
+        # Returns 0 if game hasn't started. now is a clock reading the
+        # caller already took, so an input and its log entry share one time.
         if not self.started:
             return 0
         if self.final_time is not None:
             return self.final_time  # Freeze timer on win/loss
         if self.paused:
             return self.pause_time  # Freeze timer while paused
-        return pygame.time.get_ticks() - self.start_time - self.total_pause_duration
+        if now is None:
+            now = self._clock()
+        return now - self.start_time - self.total_pause_duration
+
+    def clock_running(self):
+        # True while the displayed time is still counting up
+        return self.started and self.final_time is None and not self.paused
+
+    def get_age(self):
+        # Milliseconds since the game was created (input log timestamps)
+        return self._clock() - self.created_at
+
+    def describe(self):
+        # Everything needed to build this game's board again, see buildRecordedBoard()
+        minefield = self.minefield
+        return {'width': minefield.get_width(), 'height': minefield.get_height(),
+                'mines': minefield.get_mine_count(), 'seed': minefield.get_seed(),
+                'placed': minefield.is_placed(), 'safe_start': minefield.get_safe_start(),
+                'difficulty': self.difficulty}
 
     def toggle_pause(self):
         # Pause/unpause the game and track pause time
+        now = self._clock()
+        if self.recorder is not None:
+            self.recorder.record(self, now, REPLAY_PAUSE)
         if not self.paused:
             self.paused = True
             # Store the elapsed time up to this moment
-            self.pause_time = pygame.time.get_ticks() - self.start_time - self.total_pause_duration
+            self.pause_time = now - self.start_time - self.total_pause_duration
         else:
             self.paused = False
             # Add the time spent paused to total pause duration
-            paused_duration = pygame.time.get_ticks() - (self.start_time + self.pause_time + self.total_pause_duration)
+            paused_duration = now - (self.start_time + self.pause_time + self.total_pause_duration)
             self.total_pause_duration += paused_duration
 
     def handle_click(self, x, y, right_click=False):
-        # Handle left and right mouse clicks
+        # Handle left and right mouse clicks.
+        # Returns the flat indices of the boxes whose state changed.
+        # The clock is read once, so the log and the timer agree on when
+        # the input happened however long the reveal takes.
+        now = self._clock()
+        if self.recorder is not None:
+            self.recorder.record(self, now, REPLAY_FLAG if right_click else REPLAY_REVEAL, x, y)
         if self.game_over:
-            return
+            return NO_CHANGES
         if not self.started:
             self.started = True
-            self.start_time = pygame.time.get_ticks()
+            self.start_time = now
 
         if right_click:
-            pos = [x, y]
-            if pos in self.minefield.get_marked():
-                self.minefield.get_marked().remove(pos)
-            else:
-                self.minefield.get_marked().append(pos)
+            # Revealed boxes cannot be flagged
+            if self.minefield.is_revealed(x, y):
+                return NO_CHANGES
+            self.minefield.toggle_flag(x, y)
+            return [self.minefield.index(x, y)]
         else:
-            self.minefield.reveal(x, y)
+            # Clicking an already revealed number chords its neighbors
+            started = PROFILER.now()
+            if self.minefield.is_revealed(x, y):
+                opened = self.minefield.chord(x, y)
+            else:
+                opened = self.minefield.reveal(x, y)
+            PROFILER.add('reveal', started)
             # Trigger game over sequence if player clicked on a bomb
-            if self.minefield.is_mine(x, y):
+            if self.minefield.is_mine(x, y) or self.minefield.contains_mine(opened):
                 self.game_over = True
                 self.win = False
-                self.final_time = self.update_timer()
-                for i in range(self.minefield.get_width()):
-                    for j in range(self.minefield.get_height()):
-                        if self.minefield.get_field()[i][j] == '[X]':
-                            self.minefield.get_revealed()[i][j] = True
+                self.final_time = self.update_timer(now)
+                opened = np.concatenate((opened, self.minefield.reveal_all_mines()))
+                if self.recorder is not None:
+                    self.recorder.finish(self)
                             
             # All safe tiles revealed, player wins the game
-            elif self.minefield.all_safe_revealed():
+            elif self._check_win():
                 self.game_over = True
                 self.win = True
-                self.final_time = self.update_timer()
-                self.score_manager.save_score(currentDifficulty, self.get_elapsed_seconds())
-                for i in range(self.minefield.get_width()):
-                    for j in range(self.minefield.get_height()):
-                        if self.minefield.get_field()[i][j] != '[X]':
-                            self.minefield.get_revealed()[i][j] = True
+                self.final_time = self.update_timer(now)
+                if self.score_manager is not None:
+                    self.score_manager.save_score(self.difficulty, self.get_elapsed_seconds(), getScoreDetails(self))
+                if self.recorder is not None:
+                    self.recorder.finish(self)
+            return opened
+
+    def _check_win(self):
+        started = PROFILER.now()
+        won = self.minefield.all_safe_revealed()
+        PROFILER.add('win_check', started)
+        return won
 
     def get_elapsed_seconds(self):
         # Return how many seconds have passed since game start
         return self.update_timer() // 1000
 
     def reset(self, width, height, mine_count):
-        # Reset the game using new parameters
-        self.__init__(width, height, mine_count)
+        # Reset the game using new parameters, keeping the score manager and clock
+        self.__init__(width, height, mine_count, self.score_manager, self._clock, recorder=self.recorder)
+
+    def snapshot(self):
+        # Compact binary copy of the game: a fixed header followed by the
+        # mine, revealed and flag bitmaps of the board and its seed. A seed
+        # too big to store is left out; the board then cannot be rebuilt.
+        minefield = self.minefield
+        seed = minefield.get_seed()
+        seeded = seed is not None and 0 <= seed < 1 << (8 * SNAPSHOT_SEED_SIZE)
+        state = 0
+        for bit, on in ((SNAP_STARTED, self.started), (SNAP_PAUSED, self.paused), (SNAP_GAME_OVER, self.game_over),
+                        (SNAP_WIN, self.win), (SNAP_MINES_PLACED, minefield.is_placed()), (SNAP_SEEDED, seeded)):
+            if on:
+                state |= bit
+        safe_start = minefield.get_safe_start()
+        header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, minefield.get_width(), minefield.get_height(),
+                                      minefield.get_mine_count(), self.update_timer(), state,
+                                      -1 if safe_start is None else safe_start, self.difficulty.encode())
+        trailer = [int(seed).to_bytes(SNAPSHOT_SEED_SIZE, 'little')] if seeded else []
+        return b''.join([header.ljust(SNAPSHOT_HEADER_SIZE, b'\0')] + [plane.tobytes() for plane in minefield.get_planes()]
+                        + trailer)
+
+    @classmethod
+    def restore(cls, data, score_manager, clock=None):
+        # Game from snapshot() bytes or a memory map of a snapshot file.
+        # The timer carries on from the saved time.
+        data = np.frombuffer(data, dtype=np.uint8)
+        fields = SNAPSHOT_HEADER.unpack(data[:SNAPSHOT_HEADER.size].tobytes())
+        magic, version, width, height, mine_count, elapsed, state, safe_start, difficulty = fields
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError('not a Minesweeper Legacy snapshot')
+        size = (width * height + 7) // 8
+        planes = [data[SNAPSHOT_HEADER_SIZE + k * size:SNAPSHOT_HEADER_SIZE + (k + 1) * size] for k in range(3)]
+        seed = None
+        if state & SNAP_SEEDED:
+            end = SNAPSHOT_HEADER_SIZE + 3 * size
+            seed = int.from_bytes(data[end:end + SNAPSHOT_SEED_SIZE].tobytes(), 'little')
+        board = Minefield.from_planes(width, height, mine_count, planes, bool(state & SNAP_MINES_PLACED),
+                                      None if safe_start < 0 else safe_start, seed)
+        game = cls(width, height, mine_count, score_manager, clock, difficulty=difficulty.rstrip(b'\0').decode(), board=board)
+        game.started = bool(state & SNAP_STARTED)
+        game.game_over = bool(state & SNAP_GAME_OVER)
+        game.win = bool(state & SNAP_WIN)
+        game.start_time = game._clock() - elapsed
+        if game.game_over:
+            game.final_time = elapsed
+        if state & SNAP_PAUSED:
+            game.paused = True
+            game.pause_time = elapsed
+        return game
+
+def saveSnapshot(game, filename=SNAPSHOT_FILE):
+    writeFileAtomically(filename, game.snapshot())
+
+def loadSnapshot(filename=SNAPSHOT_FILE, score_manager=None, clock=None):
+    # The file is memory-mapped, so only the bitmaps are read, straight
+    # into the board
+    return Game.restore(np.memmap(filename, dtype=np.uint8, mode='r'), score_manager, clock)
+
+class Autosaver:
+    def __init__(self, filename=SNAPSHOT_FILE, every=AUTOSAVE_MOVES):
+        # Snapshots are taken on the main thread (a copy of the board in
+        # memory) and written by a daemon thread, so the frame loop never
+        # waits for the disk. Only the newest unwritten snapshot is kept.
+        self._filename = filename
+        self._every = every
+        self._moves = 0
+        self._pending = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._thread = threading.Thread(target=self._write, daemon=True)
+        self._thread.start()
+
+    def moved(self, game):
+        # Count a move and save every so many
+        self._moves += 1
+        if self._moves % self._every == 0:
+            self.save(game)
+
+    def save(self, game):
+        with self._lock:
+            self._pending = game.snapshot()
+            self._idle.clear()
+        self._wake.set()
+
+    def flush(self, timeout=None):
+        # Wait until every snapshot handed over is on disk
+        return self._idle.wait(timeout)
+
+    def _write(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                data, self._pending = self._pending, None
+            if data is not None:
+                writeFileAtomically(self._filename, data)
+            with self._lock:
+                if self._pending is None:
+                    self._idle.set()
+
+# ===================== Solver: safe boxes, certain mines and mine probabilities =====================
+
+def _logComb(n, k):
+    # log(n choose k), or -inf when k is out of range
+    if k < 0 or k > n:
+        return -math.inf
+    return math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+
+class _SolverBudgetExceeded(Exception):
+    pass
+
+def solveComponent(cells, constraints):
+    # Enumerate every mine layout of one frontier component that satisfies
+    # all of its clues. constraints is a list of (cell positions, mines).
+    # Returns (solutions, cell_counts): solutions[k] is the number of layouts
+    # with k mines and cell_counts[k][i] how many of those put a mine on
+    # cells[i]. Raises _SolverBudgetExceeded on components too big to enumerate.
+    size = len(cells)
+    touching = [[] for _ in range(size)]
+    for c, (positions, _) in enumerate(constraints):
+        for position in positions:
+            touching[position].append(c)
+    need = [mines for _, mines in constraints]
+    left = [len(positions) for positions, _ in constraints]
+
+    # Visit cells clue by clue so that contradictions show up early
+    order = []
+    placed = [False] * size
+    for positions, _ in constraints:
+        for position in positions:
+            if not placed[position]:
+                placed[position] = True
+                order.append(position)
+
+    solutions = np.zeros(size + 1)
+    cell_counts = np.zeros((size + 1, size))
+    assignment = np.zeros(size)
+    # Depth-first search with an explicit stack, since one Python frame per
+    # cell would overflow the recursion limit on large components.
+    # tried[d] is the value the cell at depth d holds now, -1 before its first.
+    tried = [-1] * (size + 1)
+    depth = 0
+    mines = 0
+    nodes = 1
+    while depth >= 0:
+        if depth == size:
+            solutions[mines] += 1
+            cell_counts[mines] += assignment
+            depth -= 1
+            continue
+        cell = order[depth]
+        # Take back the value tried last at this depth
+        value = tried[depth]
+        if value >= 0:
+            for c in touching[cell]:
+                need[c] += value
+                left[c] += 1
+            mines -= value
+            assignment[cell] = 0
+        value += 1
+        if value > 1:
+            tried[depth] = -1
+            depth -= 1
+            continue
+        tried[depth] = value
+        ok = True
+        for c in touching[cell]:
+            need[c] -= value
+            left[c] -= 1
+            if need[c] < 0 or need[c] > left[c]:
+                ok = False
+        mines += value
+        assignment[cell] = value
+        if ok:
+            nodes += 1
+            if nodes > SOLVER_NODE_BUDGET:
+                raise _SolverBudgetExceeded()
+            depth += 1
+
+    return solutions, cell_counts
+
+class SolverResult:
+    def __init__(self, width, height):
+        self.safe = set() # Flat indices of covered boxes that cannot be mines
+        self.mines = set() # Flat indices of covered boxes that must be mines
+        # Mine probability per box, NaN for revealed boxes
+        self.probabilities = np.full(width * height, np.nan)
+        self.interior_probability = 0.0 # For covered boxes away from any clue
+
+class _FrontierComponent:
+    def __init__(self, key):
+        # One group of clues sharing covered boxes, solved once when formed.
+        # key is a sorted tuple of (clue, covered neighbors, number).
+        self.key = key
+        self.cells = sorted({j for _, around, _ in key for j in around})
+        position = {cell: p for p, cell in enumerate(self.cells)}
+        constraints = [([position[j] for j in around], number) for _, around, number in key]
+        try:
+            self.solutions, self.cell_counts = solveComponent(self.cells, constraints)
+        except _SolverBudgetExceeded:
+            self.solutions = self.cell_counts = None
+        self.safe = []
+        self.mines = []
+        if self.solutions is None:
+            # Too large to enumerate: estimate from the per-clue mine ratio
+            ratio = dict.fromkeys(self.cells, 0.0)
+            for _, around, number in key:
+                for j in around:
+                    ratio[j] = max(ratio[j], number / len(around))
+            self.estimate = np.array([ratio[j] for j in self.cells])
+        else:
+            hits = self.cell_counts.sum(axis=0)
+            total = self.solutions.sum()
+            self.safe = [j for j, h in zip(self.cells, hits) if h == 0]
+            self.mines = [j for j, h in zip(self.cells, hits) if h == total]
+        self._by_odds = {} # Rounded log-odds of an interior mine -> (probabilities, expected mines)
+
+    def weigh(self, weight):
+        # Per-box mine probability and expected mine count when a layout
+        # with k mines has relative weight weight[k]
+        total = np.dot(self.solutions, weight)
+        if total <= 0:
+            # Weights underflowed: count every layout equally
+            weight = np.ones_like(weight)
+            total = self.solutions.sum()
+        probabilities = weight @ self.cell_counts / total
+        expected = float(np.dot(self.solutions * weight, np.arange(len(weight))) / total)
+        return probabilities, expected
+
+    def weigh_by_odds(self, log_odds):
+        # weigh() with every mine costing the same odds, cached because on
+        # large boards the odds barely move from one click to the next
+        result = self._by_odds.get(log_odds)
+        if result is None:
+            ks = np.arange(len(self.solutions))
+            exponent = log_odds * ks
+            weight = np.exp(exponent - exponent[self.solutions > 0].max())
+            result = self._by_odds[log_odds] = self.weigh(weight)
+        return result
+
+class MineSolver:
+    def __init__(self, minefield):
+        # Works only from what the player can see: revealed numbers and
+        # covered boxes. Flags are the player's guesses and are ignored.
+        self._minefield = minefield
+        self._unknowns = {} # Clue (revealed number touching covered boxes) -> its covered neighbors
+        self._clue_component = {} # Clue -> id of the frontier component holding it
+        self._cell_component = {} # Covered frontier box -> component id
+        self._components = {} # Component id -> (key, solved component)
+        self._next_component = 0
+        self._pending = [] # Index arrays of the boxes changed since the last update
+        self._pending_count = 0
+        self._rescan = True
+        self._result = None
+
+    def notify(self, indices):
+        # Tell the solver which boxes the last move changed. After a big
+        # move the frontier is cheaper to find again from scratch.
+        if not len(indices):
+            return
+        self._result = None
+        if self._rescan:
+            return
+        self._pending_count += len(indices)
+        minefield = self._minefield
+        if self._pending_count > SOLVER_RESCAN_SHARE * minefield.get_width() * minefield.get_height():
+            self._rescan = True
+            self._pending = []
+            return
+        self._pending.append(np.asarray(indices, dtype=np.intp))
+
+    def _clue_unknowns(self, i):
+        # Covered neighbors of box i if it is a clue, otherwise None
+        cells = self._minefield.get_cells()
+        cell = cells[i]
+        if not cell & CELL_REVEALED or cell & CELL_MINE or not cell & CELL_COUNT_MASK:
+            return None
+        around = tuple(j for j in self._minefield.neighbor_indices(i) if not cells[j] & CELL_REVEALED)
+        return around or None
+
+    def _hidden_mines_around(self, i):
+        # Number on clue i less the uncovered mines next to it (a lost game
+        # shows its mines, which no longer count as covered boxes)
+        cells = self._minefield.get_cells()
+        shown = sum(1 for j in self._minefield.neighbor_indices(i)
+                    if cells[j] & CELL_REVEALED and cells[j] & CELL_MINE)
+        return (cells[i] & CELL_COUNT_MASK) - shown
+
+    def _update_components(self):
+        # Only clues next to a changed box can appear, vanish or lose covered
+        # neighbors, so only the components holding those clues (or sharing
+        # boxes with them) are split up and grouped again
+        minefield = self._minefield
+        if self._rescan:
+            grid = minefield.get_grid()
+            revealed = (grid & CELL_REVEALED) != 0
+            clues = revealed & ((grid & CELL_MINE) == 0) & ((grid & CELL_COUNT_MASK) > 0)
+            clues &= countNeighbors(~revealed) > 0
+            changed = set(np.flatnonzero(clues).tolist())
+            self._rescan = False
+            # Every component is built again from the clues found
+            self._unknowns.clear()
+            self._clue_component.clear()
+            self._cell_component.clear()
+            self._components.clear()
+        else:
+            changed = set()
+            if self._pending:
+                for i in np.unique(np.concatenate(self._pending)).tolist():
+                    changed.add(i)
+                    changed.update(minefield.neighbor_indices(i))
+        self._pending = []
+        self._pending_count = 0
+        if not changed:
+            return
+
+        dirty = set()
+        for clue in changed:
+            if clue in self._clue_component:
+                dirty.add(self._clue_component[clue])
+            around = self._clue_unknowns(clue)
+            if around is None:
+                self._unknowns.pop(clue, None)
+                self._clue_component.pop(clue, None)
+            else:
+                self._unknowns[clue] = around
+                for j in around:
+                    if j in self._cell_component:
+                        dirty.add(self._cell_component[j])
+        regroup = {clue for clue in changed if clue in self._unknowns}
+        for component in dirty:
+            for clue, around, _ in self._components.pop(component).key:
+                for j in around:
+                    if self._cell_component.get(j) == component:
+                        del self._cell_component[j]
+                if clue in self._unknowns:
+                    regroup.add(clue)
+
+        # Union-find over the covered boxes of the clues being regrouped
+        parent = {}
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for clue in regroup:
+            around = self._unknowns[clue]
+            for j in around:
+                parent.setdefault(j, j)
+            root = find(around[0])
+            for j in around[1:]:
+                other = find(j)
+                if other != root:
+                    parent[other] = root
+        groups = {}
+        for clue in regroup:
+            groups.setdefault(find(self._unknowns[clue][0]), []).append(clue)
+        for clues in groups.values():
+            component = self._next_component
+            self._next_component += 1
+            key = tuple(sorted((clue, self._unknowns[clue], self._hidden_mines_around(clue)) for clue in clues))
+            self._components[component] = _FrontierComponent(key)
+            for clue in clues:
+                self._clue_component[clue] = component
+                for j in self._unknowns[clue]:
+                    self._cell_component[j] = component
+
+    def solve(self):
+        # Bring the components up to date and combine them into a SolverResult
+        if self._result is not None:
+            return self._result
+        minefield = self._minefield
+        self._update_components()
+        components = list(self._components.values())
+        exact = [c for c in components if c.solutions is not None]
+        rough = [c for c in components if c.solutions is None]
+
+        result = SolverResult(minefield.get_width(), minefield.get_height())
+        grid = minefield.get_grid()
+        covered = np.flatnonzero((grid & CELL_REVEALED).reshape(-1) == 0)
+        shown_mines = np.count_nonzero((grid & (CELL_MINE | CELL_REVEALED)) == (CELL_MINE | CELL_REVEALED))
+        frontier_size = sum(len(c.cells) for c in components)
+        interior = len(covered) - frontier_size
+        mines_left = minefield.get_mine_count() - shown_mines - sum(float(c.estimate.sum()) for c in rough)
+
+        if not rough and frontier_size <= SOLVER_EXACT_LIMIT:
+            weighed = [c.weigh(w) for c, w in zip(exact, self._exact_weights(exact, interior, int(mines_left)))]
+        else:
+            weighed = self._weigh_by_density(exact, interior, mines_left)
+
+        expected = 0.0
+        for component, (probabilities, mines) in zip(exact, weighed):
+            result.probabilities[component.cells] = probabilities
+            result.safe.update(component.safe)
+            result.mines.update(component.mines)
+            expected += mines
+        for component in rough:
+            result.probabilities[component.cells] = component.estimate
+
+        if interior > 0:
+            result.interior_probability = min(max((mines_left - expected) / interior, 0.0), 1.0)
+            inner = covered[np.isnan(result.probabilities[covered])]
+            result.probabilities[inner] = result.interior_probability
+            if result.interior_probability == 0.0:
+                result.safe.update(inner.tolist())
+        self._result = result
+        return result
+
+    def _exact_weights(self, components, interior, mines_left):
+        # Relative weight of each component having k mines: the ways the
+        # other components and the interior can hold the remaining mines.
+        # The other components' mine-count distributions are convolved and
+        # each total is weighed by C(interior, mines left over).
+        dists = [c.solutions / max(c.solutions.max(), 1) for c in components]
+        prefix = [np.ones(1)]
+        for dist in dists:
+            prefix.append(np.convolve(prefix[-1], dist))
+        suffix = [np.ones(1)]
+        for dist in reversed(dists):
+            suffix.append(np.convolve(suffix[-1], dist))
+        suffix.reverse()
+        total_size = len(prefix[-1]) - 1
+        log_weight = np.array([_logComb(interior, mines_left - k) for k in range(total_size + 1)])
+        if not np.isfinite(log_weight).any():
+            return [np.ones(len(dist)) for dist in dists]
+        weight = np.exp(log_weight - log_weight[np.isfinite(log_weight)].max())
+        weights = []
+        for c, dist in enumerate(dists):
+            others = np.convolve(prefix[c], suffix[c + 1])
+            weights.append(np.array([np.dot(others, weight[k:k + len(others)]) for k in range(len(dist))]))
+        return weights
+
+    def _weigh_by_density(self, components, interior, mines_left):
+        # Large boards: each mine in a component costs the odds of a mine in
+        # the interior, refined a few times as the interior density settles.
+        # The odds are rounded so untouched components reuse their results.
+        frontier_size = sum(len(c.cells) for c in components)
+        density = mines_left / max(interior + frontier_size, 1)
+        for _ in range(SOLVER_DENSITY_ROUNDS):
+            density = min(max(density, 1e-6), 1 - 1e-6)
+            log_odds = round(math.log(density / (1 - density)), SOLVER_ODDS_DIGITS)
+            weighed = [c.weigh_by_odds(log_odds) for c in components]
+            if interior <= 0:
+                break
+            new_density = (mines_left - sum(mines for _, mines in weighed)) / interior
+            if abs(new_density - density) < 1e-9:
+                break
+            density = new_density
+        return weighed
+
+    def hint(self):
+        # A covered, unflagged box to open next: a certainly safe one if
+        # there is any, otherwise the least likely to be a mine.
+        # Returns (x, y, probability) or None.
+        minefield = self._minefield
+        result = self.solve()
+        cells = minefield.get_cells()
+        height = minefield.get_height()
+        for i in sorted(result.safe):
+            if not cells[i] & CELL_FLAGGED:
+                return i // height, i % height, 0.0
+        probabilities = result.probabilities.copy()
+        probabilities[(minefield.get_grid() & CELL_FLAGGED).reshape(-1) != 0] = np.nan
+        if np.isnan(probabilities).all():
+            return None
+        i = int(np.nanargmin(probabilities))
+        return i // height, i % height, float(probabilities[i])
+
+# ===================== Board generation: no-guess boards and the background pool =====================
+
+def solvableWithoutGuessing(minefield, start):
+    # Open the start box, then keep opening every box the solver proves safe.
+    # The board needs no guessing if that uncovers every safe box.
+    solver = MineSolver(minefield)
+    solver.notify(minefield.reveal_cells([start]))
+    while not minefield.all_safe_revealed():
+        safe = solver.solve().safe
+        if not safe:
+            return False
+        solver.notify(minefield.reveal_cells(sorted(safe)))
+    return True
+
+def generateNoGuessBoard(width, height, mine_count, seed=None):
+    # Generate and test: try layouts around one random start box until one is
+    # solvable by logic alone. Attempt n uses the seed [seed, n], so the same
+    # seed always gives the same board. Returns a covered Minefield whose
+    # get_safe_start() is the box to open first.
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    start = int(np.random.default_rng(seed).integers(width * height))
+    for attempt in range(NOGUESS_MAX_ATTEMPTS):
+        minefield = Minefield(width, height, mine_count, [seed, attempt], first_click_safe=True)
+        if solvableWithoutGuessing(minefield, start):
+            minefield.cover_all()
+            return minefield
+    # Too dense to find one: settle for a first-click-safe board
+    return Minefield(width, height, mine_count, [seed, NOGUESS_MAX_ATTEMPTS], first_click_safe=True)
+
+class BoardPool:
+    def __init__(self, width, height, mine_counts, size=POOL_SIZE):
+        # A daemon thread keeps up to size ready no-guess boards per mine
+        # count, so starting a game never waits for generate-and-test
+        self._width = width
+        self._height = height
+        self._ready = {mines: queue.Queue(size) for mines in mine_counts}
+        self._wanted = threading.Event() # Set when a board is taken
+        self._thread = threading.Thread(target=self._fill, daemon=True)
+        self._thread.start()
+
+    def _fill(self):
+        # Top up the emptiest pool first, then sleep until a board is taken
+        while True:
+            self._wanted.clear()
+            pending = [mines for mines, ready in self._ready.items() if not ready.full()]
+            if not pending:
+                self._wanted.wait()
+                continue
+            mines = min(pending, key=lambda mines: self._ready[mines].qsize())
+            self._ready[mines].put(generateNoGuessBoard(self._width, self._height, mines))
+
+    def take(self, mine_count):
+        # A ready board, generated on the spot only if the pool ran dry
+        self._wanted.set()
+        try:
+            return self._ready[mine_count].get_nowait()
+        except (KeyError, queue.Empty):
+            return generateNoGuessBoard(self._width, self._height, mine_count)
+
+# ===================== Board analysis: openings and 3BV =====================
+
+def labelOpenings(mask):
+    # Connected areas (8-connected) of a boolean mask, for one board or a
+    # stack of boards on the last two axes. Every True box gets the flat
+    # index of one box of its area (its root), every other box -1.
+    # Union-find run on all edges at once: each round hooks every root onto
+    # the smallest root it touches, then pointer jumping flattens the trees,
+    # so there are only a few rounds of whole-array operations.
+    # Boxes that follow each other down a column are joined from the start:
+    # each such run is one node, numbered in board order (32-bit numbers
+    # halve the memory traffic of the random lookups)
+    above = np.zeros_like(mask)
+    above[..., 1:] = mask[..., :-1]
+    starts = mask & ~above
+    run_starts = np.flatnonzero(starts)
+    node = np.cumsum(starts, dtype=np.int32).reshape(mask.shape) - 1
+    node[~mask] = -1
+    # Runs in neighboring columns touch if and only if the top box of one
+    # of them touches the other, so only those edges are needed
+    height = mask.shape[-1]
+    firsts, seconds = [], []
+    for dy in (-1, 0, 1):
+        ys, yd = slice(max(-dy, 0), height - max(dy, 0)), slice(max(dy, 0), height - max(-dy, 0))
+        first, second = node[..., :-1, ys], node[..., 1:, yd]
+        touching = (first >= 0) & (second >= 0) & (starts[..., :-1, ys] | starts[..., 1:, yd])
+        firsts.append(first[touching])
+        seconds.append(second[touching])
+    first, second = np.concatenate(firsts), np.concatenate(seconds)
+    parent = np.arange(len(run_starts), dtype=np.int32)
+    # Every run starts as its own root
+    root_a, root_b = first, second
+    while len(first):
+        np.minimum.at(parent, np.maximum(root_a, root_b), np.minimum(root_a, root_b))
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+        root_a, root_b = parent[first], parent[second]
+        # Edges inside one tree are done for good
+        apart = root_a != root_b
+        first, second, root_a, root_b = first[apart], second[apart], root_a[apart], root_b[apart]
+    labels = np.full(mask.shape, -1, dtype=np.intp)
+    labels[mask] = run_starts[parent[node[mask]]]
+    return labels
+
+def _clickAreas(cells):
+    # What 3BV counts one click each for, on a grid of packed cell bytes or
+    # a stack of them: the openings (areas of zeros, labelled by their
+    # root) and the safe numbers that touch no zero
+    mines = (cells & CELL_MINE) != 0
+    zeros = ~mines & ((cells & CELL_COUNT_MASK) == 0)
+    isolated = ~mines & ~zeros & (countNeighbors(zeros) == 0)
+    return labelOpenings(zeros), isolated
+
+def countBBBV(cells):
+    # 3BV (the fewest clicks that clear a board without flags) for a grid of
+    # packed cell bytes, or a stack of them
+    labels, isolated = _clickAreas(cells)
+    roots = labels == np.arange(labels.size).reshape(labels.shape)
+    return roots.sum(axis=(-2, -1)) + isolated.sum(axis=(-2, -1))
+
+def analyzeBoard(minefield):
+    # 3BV of a board with its mines placed, plus its openings: how many,
+    # how many zeros the biggest one has and the flat index of its root
+    labels, isolated = _clickAreas(minefield.get_grid())
+    sizes = np.bincount(labels[labels >= 0])
+    openings = int(np.count_nonzero(sizes))
+    isolated = int(np.count_nonzero(isolated))
+    largest = int(sizes.argmax()) if openings else None
+    return {'3bv': openings + isolated, 'openings': openings, 'isolated': isolated,
+            'largest_opening': int(sizes[largest]) if openings else 0, 'largest_root': largest}
+
+def getScoreDetails(game):
+    # What a win stores next to its time: the board's 3BV, the 3BV per
+    # second, and the board header (seed and layout) to rebuild it from,
+    # left out for a board without a seed (one resumed from an older save).
+    # The rate counts at least a second, so a win on the first click does
+    # not top the leaderboard.
+    bbbv = int(countBBBV(game.minefield.get_grid()))
+    details = {'3bv': bbbv, '3bv_s': round(bbbv * 1000 / max(game.final_time, 1000), 3)}
+    if game.minefield.get_seed() is not None:
+        details['board'] = {key: value for key, value in game.describe().items() if key != 'difficulty'}
+    return details
+
+def backfillShard(entries):
+    # Worker entry point: (line number, entry) pairs -> (line number, 3BV).
+    # Boards are rebuilt from their headers and analysed a stack of the
+    # same size at a time.
+    stacks = collections.defaultdict(list)
+    for number, entry in entries:
+        board = buildRecordedBoard(entry['board'])
+        stacks[board.get_width(), board.get_height()].append((number, board.get_grid()))
+    results = []
+    for boards in stacks.values():
+        counts = countBBBV(np.stack([grid for _, grid in boards]))
+        results += [(number, int(bbbv)) for (number, _), bbbv in zip(boards, counts)]
+    return results
+
+def runBackfillCommand(args, filename='wins.jsonl'):
+    # --backfill: add 3BV and 3BV/s to recorded wins that lack them. Only
+    # wins stored with their board header can be rebuilt; the others are
+    # counted and left as they are. The journal is rewritten atomically and
+    # the checkpoint rebuilt from it.
+    with open(filename, 'r') as f:
+        lines = f.read().split('\n')
+    entries = {}
+    for number, line in enumerate(lines):
+        try:
+            entries[number] = json.loads(line)
+        except ValueError:
+            pass # Blank or damaged line, kept as it is
+    todo = [(number, entry) for number, entry in entries.items() if '3bv' not in entry and 'board' in entry]
+    missing = sum(1 for entry in entries.values() if '3bv' not in entry and 'board' not in entry)
+    start = time.perf_counter()
+    jobs = [todo[i:i + SIM_SHARD_SIZE] for i in range(0, len(todo), SIM_SHARD_SIZE)]
+    with multiprocessing.Pool(args.processes) as pool:
+        for results in pool.imap_unordered(backfillShard, jobs):
+            for number, bbbv in results:
+                entry = entries[number]
+                entry['3bv'] = bbbv
+                # Only whole seconds are stored with old wins
+                entry['3bv_s'] = round(bbbv / max(entry['time'], 1), 3)
+                lines[number] = json.dumps(entry)
+    if todo:
+        writeFileAtomically(filename, '\n'.join(lines))
+        # The checkpoint's 3BV/s lists are out of date; loading the journal
+        # without it builds a new one
+        if os.path.exists(filename + '.index'):
+            os.remove(filename + '.index')
+        ScoreManager(filename)
+    print(f"Backfilled 3BV for {len(todo)} of {len(entries)} wins in {time.perf_counter() - start:.2f}s; "
+          f"{missing} wins have no board to rebuild")
+
+# ===================== Difficulty bar and HUD (bands above and below the grid) =====================
+
+DIFFICULTIES = [
+    ('VERY EASY', VERY_EASY_MINES),
+    ('EASY', EASY_MINES),
+    ('NORMAL', NORMAL_MINES),
+    ('HARD', HARD_MINES)
+]
+
+def getTopBandRect():
+    return pygame.Rect(0, 0, WINDOWWIDTH, YMARGIN - 5)
+
+def getHudBandRect():
+    top = YMARGIN + VIEWHEIGHT * (BOXSIZE + GAPSIZE)
+    return pygame.Rect(0, top, WINDOWWIDTH, WINDOWHEIGHT - top)
+
+def drawDifficultyButtons(hovered_label, game_over):
+    # Difficulty labels are hidden once the game is over
+    if game_over:
+        return
+    for label, _ in DIFFICULTIES:
+        rect = DIFFICULTY_RECTS[label]
+        if label == hovered_label:
+            highlightButton(rect)
+        drawText(label, BASICFONT, GREEN if label == currentDifficulty else RED, DISPLAYSURFACE, rect.centerx, rect.centery)
+
+def drawHud(elapsed, flags_used, counter, reset_hovered):
+    # Reset button, timer, bomb count (boxes opened on an endless board)
+    # and flag count under the grid
+    start_x = WINDOWWIDTH // 2 - 300
+    y_pos = YMARGIN + VIEWHEIGHT * (BOXSIZE + GAPSIZE) + 20
+    spacing = 190
+
+    if reset_hovered:
+        highlightButton(RESET_RECT)
+    DISPLAYSURFACE.blit(RESET_SURF, RESET_RECT)
+
+    drawText(f"Time: {elapsed // 60:02}:{elapsed % 60:02}", BASICFONT, BLACK, DISPLAYSURFACE, start_x + spacing, y_pos)
+    drawText(counter, BASICFONT, BLACK, DISPLAYSURFACE, start_x + spacing * 2, y_pos)
+    drawText(f"Flags: {flags_used}", BASICFONT, BLACK, DISPLAYSURFACE, start_x + spacing * 3, y_pos)
+
+def redrawBand(rect, draw, *args):
+    # Clear one band of the window and redraw it, clipped to the band
+    DISPLAYSURFACE.set_clip(rect)
+    DISPLAYSURFACE.fill(BGCOLOR, rect)
+    draw(*args)
+    DISPLAYSURFACE.set_clip(None)
+    return rect
+
+def getMineCount(mines):
+    # Difficulties are set for a 20x20 board; larger boards keep the density
+    return round(mines * FIELDWIDTH * FIELDHEIGHT / (VIEWWIDTH * VIEWHEIGHT))
+
+def isStandardBoard():
+    # Best times are only kept for the board the difficulties were made for
+    return not ENDLESS and (FIELDWIDTH, FIELDHEIGHT) == (VIEWWIDTH, VIEWHEIGHT)
+
+def newGame(score_manager, pool, recorder=None):
+    # Start a game of the current difficulty on the chosen kind of board;
+    # no-guess boards come ready-made from the pool. Returns the game and
+    # its solver (None on an endless board, which the solver cannot see).
+    if ENDLESS:
+        board = ChunkedMinefield(density=MINESTOTAL / (VIEWWIDTH * VIEWHEIGHT))
+        return Game(None, None, None, None, board=board), None
+    board = pool.take(getMineCount(MINESTOTAL)) if pool is not None else None
+    # An explicit seed, so a recorded game can be rebuilt
+    game = Game(FIELDWIDTH, FIELDHEIGHT, getMineCount(MINESTOTAL), score_manager if isStandardBoard() else None,
+                seed=np.random.SeedSequence().entropy, board=board, first_click_safe=BOARDMODE == BOARD_SAFE,
+                recorder=recorder)
+    return game, MineSolver(game.minefield)
+
+def startReplayedGame(feed):
+    # Next game of a replay, shown with the board size and difficulty it
+    # was recorded with. Returns (None, None) at the end of the log.
+    global FIELDWIDTH, FIELDHEIGHT, CAMERA, currentDifficulty, MINESTOTAL
+    game = feed.next_game()
+    if game is None:
+        return None, None
+    size = game.minefield.get_width(), game.minefield.get_height()
+    if size != (FIELDWIDTH, FIELDHEIGHT):
+        FIELDWIDTH, FIELDHEIGHT = size
+        CAMERA = Camera(FIELDWIDTH, FIELDHEIGHT)
+    currentDifficulty = game.difficulty
+    MINESTOTAL = dict(DIFFICULTIES).get(currentDifficulty, MINESTOTAL)
+    return game, MineSolver(game.minefield)
+
+def showMove(changed, renderer, solver, show_heatmap):
+    # Pass the boxes a move changed to the renderer and the solver
+    if len(changed):
+        renderer.invalidate(changed)
+        renderer.set_hint(None)
+        if solver is not None:
+            solver.notify(changed)
+            if show_heatmap:
+                renderer.set_heatmap(solver.solve().probabilities)
 
 # ===================== Main game loop and event handling =====================
 
 def main():
     # Global variables used for rendering and tracking
-    global DISPLAYSURFACE, BASICFONT, RESET_SURF, RESET_RECT
-    global VERY_EASY_RECT, EASY_RECT, NORMAL_RECT, HARD_RECT, currentDifficulty, MINESTOTAL
-    # Create a ScoreManager instance to track and retrieve best completion times
-    score_manager = ScoreManager()
-    # Initialize Pygame and set up display
-    pygame.init()
+    global DISPLAYSURFACE, BASICFONT, RESET_SURF, RESET_RECT, TILES, HEATTILES, CAMERA
+    global DIFFICULTY_RECTS, currentDifficulty, MINESTOTAL, FIELDWIDTH, FIELDHEIGHT
+    # Create a ScoreManager instance to track and retrieve best completion
+    # times; the history is read once the first frame is on screen
+    score_manager = ScoreManager(load=False)
+    # Start only the parts of pygame the game uses (no audio or joysticks)
+    pygame.display.init()
+    pygame.font.init()
+    markStartup('pygame')
     pygame.display.set_caption("Minesweeper Legacy")
     FPSCLOCK = pygame.time.Clock()
     DISPLAYSURFACE = pygame.display.set_mode((WINDOWWIDTH, WINDOWHEIGHT))
-    BASICFONT = pygame.font.SysFont(FONTTYPE, FONTSIZE, bold=True)
+    markStartup('window')
+    BASICFONT = loadFont(FONTSIZE, bold=True)
+    markStartup('font')
+    TILES = buildTileAtlas()
+    HEATTILES = buildHeatTiles()
+    markStartup('tiles')
     # Create reset and difficulty buttons
-    RESET_SURF, RESET_RECT = drawButton("RESET", TEXTCOLOR_3, RESETBGCOLOR, WINDOWWIDTH / 2 - 300, WINDOWHEIGHT - 50)
-    VERY_EASY_SURF, VERY_EASY_RECT = drawButton("VERY EASY", TEXTCOLOR_3, RESETBGCOLOR, 110, 30)
-    EASY_SURF, EASY_RECT = drawButton("EASY", TEXTCOLOR_3, RESETBGCOLOR, 310, 30)
-    NORMAL_SURF, NORMAL_RECT = drawButton("NORMAL", TEXTCOLOR_3, RESETBGCOLOR, 510, 30)
-    HARD_SURF, HARD_RECT = drawButton("HARD", TEXTCOLOR_3, RESETBGCOLOR, 710, 30)
+    RESET_SURF, RESET_RECT = drawButton("RESET", TEXTCOLOR_3, RESETBGCOLOR, WINDOWWIDTH // 2 - 300, YMARGIN + VIEWHEIGHT * (BOXSIZE + GAPSIZE) + 20)
+    DIFFICULTY_RECTS = {}
+    for position, (label, _) in enumerate(DIFFICULTIES):
+        DIFFICULTY_RECTS[label] = drawButton(label, TEXTCOLOR_3, RESETBGCOLOR, 110 + 200 * position, 30)[1]
     # Create initial game state
     currentDifficulty = 'NORMAL'
     MINESTOTAL = NORMAL_MINES
-    game = Game(FIELDWIDTH, FIELDHEIGHT, MINESTOTAL, score_manager)
+    # Pick up a saved game; its board size replaces the configured one
+    resumed = None
+    if RESUME and not ENDLESS:
+        resumed = loadSnapshot(RESUME, score_manager)
+        FIELDWIDTH, FIELDHEIGHT = resumed.minefield.get_width(), resumed.minefield.get_height()
+        currentDifficulty = resumed.difficulty
+        MINESTOTAL = dict(DIFFICULTIES).get(currentDifficulty, MINESTOTAL)
+        if not isStandardBoard():
+            resumed.score_manager = None
+    # No-guess boards are generated ahead of time on a background thread
+    pool = None
+    if BOARDMODE == BOARD_NOGUESS and not ENDLESS:
+        pool = BoardPool(FIELDWIDTH, FIELDHEIGHT, [getMineCount(mines) for _, mines in DIFFICULTIES])
+    # Pan with the arrow keys or by dragging with the middle button, zoom with the wheel
+    CAMERA = Camera(None, None) if ENDLESS else Camera(FIELDWIDTH, FIELDHEIGHT)
+    dragging = False
+    # Log every input to a file, or play a log back instead of taking input
+    recorder = GameRecorder(RECORD) if RECORD and not ENDLESS else None
+    feed = ReplayFeed(loadRecording(REPLAY)) if REPLAY and not ENDLESS else None
+    if feed is not None:
+        game, solver = startReplayedGame(feed)
+    elif resumed is None:
+        game, solver = newGame(score_manager, pool, recorder)
+    else:
+        game, solver = resumed, MineSolver(resumed.minefield)
+    # Save the game every few moves on a background thread (endless boards
+    # have no snapshot format, and replays are already on disk)
+    autosaver = None if ENDLESS or feed is not None else Autosaver()
+    show_heatmap = False
+    # Board surface that is only redrawn where boxes change
+    renderer = BoardRenderer()
+    # Outline the start box of a no-guess board
+    renderer.set_hint(game.minefield.get_safe_start())
+    pause_overlay = PauseOverlay()
+    flash_overlay = FlashOverlay()
+    full_redraw = True
+    top_state = hud_state = None
     # Flash effect state (used to flash screen color on game over)
     flash_alpha = 0
     flash_direction = 20
     flash_started = False
+    flash_pulses = 0
+    if PROFILE:
+        PROFILER.toggle()
+    markStartup('game')
+    scores_pending = True
 
     # ========================= Main game loop =========================
 
     while True:
+        # Best times are read once the first frame has been drawn
+        if scores_pending and not full_redraw:
+            markStartup('first frame')
+            score_manager.ensure_loaded()
+            markStartup('scores')
+            scores_pending = False
+            if STARTUP_REPORT:
+                printStartupReport()
+        # Run at a fixed frame rate only while the game-over flash animates.
+        # Otherwise sleep until there is input, or until the clock display
+        # needs its next second.
+        flash_running = game.game_over and flash_pulses < FLASH_PULSES
+        # A replay moves on once a game's inputs have run out and its flash is over
+        if feed is not None and feed.wait_ms(game) is None and not flash_running:
+            next_game, next_solver = startReplayedGame(feed)
+            if next_game is not None:
+                game, solver = next_game, next_solver
+                renderer.set_hint(game.minefield.get_safe_start())
+                renderer.set_heatmap(solver.solve().probabilities if show_heatmap else None)
+                full_redraw = True
+                flash_started = False
+                flash_pulses = 0
+        replay_wait = feed.wait_ms(game) if feed is not None else None
+        # Held arrow keys scroll a little every frame
+        keys = pygame.key.get_pressed()
+        scroll_x = (keys[K_RIGHT] - keys[K_LEFT]) * PAN_STEP
+        scroll_y = (keys[K_DOWN] - keys[K_UP]) * PAN_STEP
+        scrolling = bool(scroll_x or scroll_y) and not game.paused
+        if flash_running or full_redraw or scrolling or replay_wait == 0:
+            events = pygame.event.get()
+        else:
+            timeout = 1000 - game.update_timer() % 1000 if game.clock_running() else 0
+            # Also wake for the next recorded input (a timeout of 0 waits forever)
+            if replay_wait is not None:
+                timeout = min(timeout, replay_wait) if timeout else replay_wait
+            events = [pygame.event.wait(timeout)] + pygame.event.get()
+        PROFILER.begin_frame()
+        started = PROFILER.now()
+
         # Get mouse position
         mouse_x, mouse_y = pygame.mouse.get_pos()
         mouseClicked = False
         rightClicked = False
         
         # Event processing
-        for event in pygame.event.get():
+        for event in events:
             if event.type == QUIT:
+                if autosaver is not None:
+                    autosaver.save(game)
+                    autosaver.flush(1.0)
+                if recorder is not None:
+                    recorder.close()
+                if PROFILE:
+                    PROFILER.export(PROFILE)
                 terminate()
-            # Detect mouse click and check if it's a right-click
+            # Window was uncovered or restored, paint everything again
+            elif event.type in (VIDEOEXPOSE, WINDOWEXPOSED):
+                full_redraw = True
+            # Detect mouse click and check if it's a right-click; the middle
+            # button drags the board (wheel turns also arrive as buttons 4-5)
             elif event.type == MOUSEBUTTONDOWN:
                 mouse_x, mouse_y = event.pos
-                mouseClicked = True
-                if event.button == 3: \
-                    rightClicked = True
+                if event.button == 2:
+                    dragging = True
+                elif event.button in (1, 3) and feed is None:
+                    mouseClicked = True
+                    if event.button == 3: \
+                        rightClicked = True
+            elif event.type == MOUSEBUTTONUP and event.button == 2:
+                dragging = False
+            elif event.type == MOUSEMOTION and dragging and not game.paused:
+                CAMERA.pan(-event.rel[0], -event.rel[1])
+            elif event.type == MOUSEWHEEL and not game.paused:
+                CAMERA.zoom(event.y, mouse_x, mouse_y)
             # Handle keyboard shortcuts: pause with ESC, flag with SPACE
             elif event.type == KEYDOWN:
-                if event.key == K_ESCAPE:
+                if event.key == K_ESCAPE and feed is None:
                     game.toggle_pause()
-                elif event.key == K_SPACE: 
+                    full_redraw = True
+                    if autosaver is not None and game.paused:
+                        autosaver.save(game)
+                elif event.key == K_SPACE and feed is None:
                     box_x, box_y = getBoxAtPixel(mouse_x, mouse_y)
                     if box_x is not None and box_y is not None:
-                        game.handle_click(box_x, box_y, right_click=True)
+                        showMove(game.handle_click(box_x, box_y, right_click=True), renderer, solver, show_heatmap)
+                        if autosaver is not None:
+                            autosaver.moved(game)
+                # Hint: outline a safe box (or the least risky one) with H,
+                # toggle the mine probability heat map with P
+                elif event.key == K_h and not game.game_over and solver is not None:
+                    hint = solver.hint()
+                    renderer.set_hint(None if hint is None else hint[0] * FIELDHEIGHT + hint[1])
+                elif event.key == K_p and solver is not None:
+                    show_heatmap = not show_heatmap
+                    renderer.set_heatmap(solver.solve().probabilities if show_heatmap else None)
+                # Frame profiler: F3 shows or hides the overlay, F4 saves the trace
+                elif event.key == K_F3:
+                    PROFILER.toggle()
+                    full_redraw = True
+                elif event.key == K_F4 and PROFILER.enabled:
+                    PROFILER.export(PROFILE or PROFILE_FILE)
+
+        # Recorded inputs whose time has come
+        if feed is not None:
+            for action in feed.due(game):
+                if action[1] == REPLAY_PAUSE:
+                    game.toggle_pause()
+                    full_redraw = True
+                else:
+                    changed = game.handle_click(action[2], action[3], right_click=action[1] == REPLAY_FLAG)
+                    showMove(changed, renderer, solver, show_heatmap)
+        PROFILER.add('events', started)
 
         # Pause screen rendering
         if game.paused:
-            drawPauseMenu(game.get_elapsed_seconds(), score_manager)
-            pygame.display.update()
-            FPSCLOCK.tick(FPS)
+            if full_redraw:
+                pause_overlay.draw(DISPLAYSURFACE, game.get_elapsed_seconds(), score_manager)
+                pygame.display.update()
+                full_redraw = False
+            PROFILER.end_frame()
             continue
 
-        # Clear screen for new frame
-        DISPLAYSURFACE.fill(BGCOLOR)
-
-        # Flashing screen if game is over
-        if game.game_over:
-            if not flash_started:
-                flash_alpha = 0
-                flash_direction = 20
-                flash_started = True  # ✅ Only initialize once
-
-            flash_alpha += flash_direction
-            if flash_alpha >= 255:
-                flash_alpha = 255
-                flash_direction = -20
-            elif flash_alpha <= 0:
-                flash_alpha = 0
-                flash_direction = 20
-                
-            # Create color flash overlay (blue if win, red if loss)
-            flash_color = BLUE if game.win else RED
-            flash_surf = pygame.Surface((WINDOWWIDTH, WINDOWHEIGHT), pygame.SRCALPHA)
-            flash_surf.fill((*flash_color, flash_alpha))
-            
-            # Leave game grid visible
-            grid_rect = pygame.Rect(
-                XMARGIN,
-                YMARGIN,
-                (BOXSIZE + GAPSIZE) * FIELDWIDTH,
-                (BOXSIZE + GAPSIZE) * FIELDHEIGHT
-            )
-            flash_surf.fill((0, 0, 0, 0), rect=grid_rect)
-            
-            DISPLAYSURFACE.blit(flash_surf, (0, 0))
-
-        # Draw the game field background
-        pygame.draw.rect(DISPLAYSURFACE, FIELDCOLOR, (
-            XMARGIN - 5,
-            YMARGIN - 5,
-            (BOXSIZE + GAPSIZE) * FIELDWIDTH + 5,
-            (BOXSIZE + GAPSIZE) * FIELDHEIGHT + 5
-        ))
-
-        drawField() # Draw empty boxes
-
         # ===================== Difficulty switching logic =====================
 
+        hovered_label = None
         if not game.game_over:
-            for rect, mines, label in [
-                (VERY_EASY_RECT, VERY_EASY_MINES, 'VERY EASY'),
-                (EASY_RECT, EASY_MINES, 'EASY'),
-                (NORMAL_RECT, NORMAL_MINES, 'NORMAL'),
-                (HARD_RECT, HARD_MINES, 'HARD')
-            ]:
-                if rect.collidepoint(mouse_x, mouse_y):
-                    highlightButton(rect)
+            for label, mines in DIFFICULTIES:
+                if DIFFICULTY_RECTS[label].collidepoint(mouse_x, mouse_y):
+                    hovered_label = label
                     if mouseClicked:
                         MINESTOTAL = mines
                         currentDifficulty = label
-                        game = Game(FIELDWIDTH, FIELDHEIGHT, MINESTOTAL, score_manager)
+                        game, solver = newGame(score_manager, pool, recorder)
+                        renderer.set_hint(game.minefield.get_safe_start())
+                        renderer.set_heatmap(solver.solve().probabilities if show_heatmap else None)
+                        full_redraw = True
                         flash_alpha = 0
                         flash_direction = 20
                         flash_started = False
-
-                drawText(label, BASICFONT, GREEN if label == currentDifficulty else RED, DISPLAYSURFACE, rect.centerx, rect.centery)
+                        flash_pulses = 0
 
         # ===================== Reset button =====================
 
         # Restart the game when the reset button is clicked
-        if RESET_RECT.collidepoint(mouse_x, mouse_y):
-            highlightButton(RESET_RECT)
-            if mouseClicked:
-                game = Game(FIELDWIDTH, FIELDHEIGHT, MINESTOTAL, score_manager)
-                
-        DISPLAYSURFACE.blit(RESET_SURF, RESET_RECT)
+        reset_hovered = RESET_RECT.collidepoint(mouse_x, mouse_y)
+        if reset_hovered and mouseClicked:
+            game, solver = newGame(score_manager, pool, recorder)
+            renderer.set_hint(game.minefield.get_safe_start())
+            renderer.set_heatmap(solver.solve().probabilities if show_heatmap else None)
+            full_redraw = True
+            flash_started = False
+            flash_pulses = 0
 
         # ===================== Mouse hover + click on boxes =====================
 
+        if scrolling:
+            CAMERA.pan(scroll_x, scroll_y)
+        started = PROFILER.now()
         box_x, box_y = getBoxAtPixel(mouse_x, mouse_y)
+        PROFILER.add('pick', started)
+        renderer.set_hover(box_x, box_y)
         if box_x is not None and box_y is not None:
-            if not game.minefield.get_revealed()[box_x][box_y]:
-                highlightBox(box_x, box_y)
-
             # Reveal or mark box when clicked
             if mouseClicked and not game.game_over:
-                game.handle_click(box_x, box_y, right_click=rightClicked)
+                showMove(game.handle_click(box_x, box_y, right_click=rightClicked), renderer, solver, show_heatmap)
+                if autosaver is not None:
+                    autosaver.moved(game)
 
-        # ===================== Draw field and cover =====================
+        # Flashing screen if game is over, settling on full color after a few pulses
+        if game.game_over and flash_pulses < FLASH_PULSES:
+            if not flash_started:
+                flash_alpha = 0
+                flash_direction = 20
+                flash_started = True  # ✅ Only initialize once
 
-        drawMinesNumbers(game.minefield.get_field())
-        drawCovers(game.minefield.get_revealed(), game.minefield.get_marked())
+            flash_alpha += flash_direction
+            if flash_alpha >= 255:
+                flash_alpha = 255
+                flash_direction = -20
+                flash_pulses += 1
+            elif flash_alpha <= 0:
+                flash_alpha = 0
+                flash_direction = 20
+            # The flash covers the whole window, so every frame is a full redraw
+            full_redraw = True
 
-        # ===================== Display time, bombs, and flags =====================
+        # ===================== Draw field, difficulty bar and HUD =====================
 
-        elapsed = game.get_elapsed_seconds()
-        flags_used = len(game.minefield.get_marked())
-        start_x = WINDOWWIDTH // 2 - 300
-        y_pos = YMARGIN + FIELDHEIGHT * (BOXSIZE + GAPSIZE) + 20
-        spacing = 190
-        
-        RESET_RECT.centerx = start_x
-        RESET_RECT.centery = y_pos
+        new_top_state = (hovered_label, currentDifficulty, game.game_over)
+        if ENDLESS:
+            counter = f"Opened: {game.minefield.get_revealed_count()}"
+        else:
+            counter = f"Bombs: {game.minefield.get_mine_count()}"
+        new_hud_state = (game.get_elapsed_seconds(), game.minefield.get_flag_count(), counter, reset_hovered)
+
+        if full_redraw:
+            # Clear screen for new frame
+            started = PROFILER.now()
+            DISPLAYSURFACE.fill(BGCOLOR)
+            if game.game_over:
+                # Color flash overlay (blue if win, red if loss); the board
+                # drawn right after it keeps the grid visible
+                flash_overlay.draw(DISPLAYSURFACE, BLUE if game.win else RED, flash_alpha)
+            renderer.render(DISPLAYSURFACE, game.minefield, full=True)
+            PROFILER.add('board', started)
+            started = PROFILER.now()
+            drawDifficultyButtons(hovered_label, game.game_over)
+            drawHud(*new_hud_state)
+            PROFILER.add('hud', started)
+            if PROFILER.visible:
+                PROFILER.draw(DISPLAYSURFACE)
+            started = PROFILER.now()
+            pygame.display.update()
+            PROFILER.add('display', started)
+            full_redraw = False
+        else:
+            # Only push the boxes and bands that changed since the last frame
+            started = PROFILER.now()
+            dirty_rects = renderer.render(DISPLAYSURFACE, game.minefield)
+            PROFILER.add('board', started)
+            started = PROFILER.now()
+            if new_top_state != top_state:
+                dirty_rects.append(redrawBand(getTopBandRect(), drawDifficultyButtons, hovered_label, game.game_over))
+            if new_hud_state != hud_state:
+                dirty_rects.append(redrawBand(getHudBandRect(), drawHud, *new_hud_state))
+            PROFILER.add('hud', started)
+            # The overlay sits on the board, so it is drawn again over
+            # whatever the renderer just repainted
+            if PROFILER.visible:
+                dirty_rects.append(PROFILER.draw(DISPLAYSURFACE))
+            started = PROFILER.now()
+            if dirty_rects:
+                pygame.display.update(dirty_rects)
+            PROFILER.add('display', started)
+        top_state, hud_state = new_top_state, new_hud_state
+        PROFILER.end_frame()
+
+        if flash_running or scrolling:
+            FPSCLOCK.tick(FPS)
 
-        drawText(f"Time: {elapsed // 60:02}:{elapsed % 60:02}", BASICFONT, BLACK, DISPLAYSURFACE, start_x + spacing, y_pos)
-        drawText(f"Bombs: {MINESTOTAL}", BASICFONT, BLACK, DISPLAYSURFACE, start_x + spacing * 2, y_pos)
-        drawText(f"Flags: {flags_used}", BASICFONT, BLACK, DISPLAYSURFACE, start_x + spacing * 3, y_pos)
+# ===================== Headless simulation (no display needed) =====================
+
+class StepClock:
+    # Stand-in for getTicks() that only moves when told to
+    def __init__(self, start=0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, ms):
+        self.now += ms
+
+def findObviousMoves(minefield):
+    # Single-box deductions over the whole board at once: a number whose
+    # flags already match it can be chorded, and a number whose covered
+    # neighbors are all mines lets us flag them. Returns two lists of
+    # (x, y): boxes to chord and boxes to flag.
+    grid = minefield.get_grid()
+    revealed = (grid & CELL_REVEALED).astype(bool)
+    flagged = (grid & CELL_FLAGGED).astype(bool) & ~revealed
+    covered = ~revealed & ~flagged
+    numbers = (grid & CELL_COUNT_MASK).astype(np.int16)
+    flags_around = countNeighbors(flagged)
+    covered_around = countNeighbors(covered)
+    clues = revealed & (numbers > 0) & (covered_around > 0)
+    chords = np.argwhere(clues & (flags_around == numbers))
+    full = clues & (flags_around + covered_around == numbers)
+    to_flag = np.argwhere(covered & (countNeighbors(full) > 0))
+    # A covered box next to a "full" number is a mine for sure
+    return chords.tolist(), to_flag.tolist()
+
+def simulateGame(mine_count, seed, width=FIELDWIDTH, height=FIELDHEIGHT):
+    # Play one game without a display: obvious deductions first, a random
+    # covered box when there are none. Returns (won, clicks, milliseconds).
+    clock = StepClock()
+    game = Game(width, height, mine_count, None, clock=clock, seed=seed)
+    minefield = game.minefield
+    rng = np.random.default_rng(seed)
+    clicks = 0
+    while not game.game_over:
+        chords, to_flag = findObviousMoves(minefield)
+        for x, y in to_flag:
+            game.handle_click(x, y, right_click=True)
+        moves = chords
+        if not moves and not to_flag:
+            covered = np.flatnonzero((minefield.get_grid() & (CELL_REVEALED | CELL_FLAGGED)).reshape(-1) == 0)
+            moves = [divmod(int(rng.choice(covered)), height)]
+        for x, y in moves:
+            clock.advance(SIM_CLICK_MS)
+            game.handle_click(x, y)
+            clicks += 1
+            if game.game_over:
+                break
+    return game.win, clicks, game.update_timer()
+
+def simulateShard(job):
+    # Worker entry point: play a contiguous range of seeds and return totals
+    mine_count, first_seed, games, width, height = job
+    stats = {'games': 0, 'wins': 0, 'clicks': 0, 'win_ms': 0}
+    for seed in range(first_seed, first_seed + games):
+        won, clicks, elapsed = simulateGame(mine_count, seed, width, height)
+        stats['games'] += 1
+        stats['clicks'] += clicks
+        if won:
+            stats['wins'] += 1
+            stats['win_ms'] += elapsed
+    return stats
+
+def runSimulations(mine_count, games, first_seed=0, processes=None, shard_size=SIM_SHARD_SIZE,
+                   width=FIELDWIDTH, height=FIELDHEIGHT):
+    # Shard the seeds across a process pool and yield the running totals
+    # each time a shard finishes, so callers can report progress as it comes
+    jobs = [(mine_count, seed, min(shard_size, first_seed + games - seed), width, height)
+            for seed in range(first_seed, first_seed + games, shard_size)]
+    totals = {'games': 0, 'wins': 0, 'clicks': 0, 'win_ms': 0}
+    with multiprocessing.Pool(processes) as pool:
+        for stats in pool.imap_unordered(simulateShard, jobs):
+            for key in totals:
+                totals[key] += stats[key]
+            yield dict(totals)
+
+def printSimulationReport(difficulty, totals, seconds):
+    games, wins = totals['games'], totals['wins']
+    losses = games - wins
+    mean_win = totals['win_ms'] / wins / 1000 if wins else 0
+    print(f"{difficulty}: {games} games, {wins} wins, {losses} losses, "
+          f"win rate {wins / games:.1%}, {totals['clicks'] / games:.1f} clicks/game, "
+          f"mean win time {mean_win:.1f}s, {games / seconds:.0f} games/s")
+
+def runSimulationCommand(args):
+    # --simulate: play the requested number of games per difficulty headless
+    # on the board size chosen with --size
+    labels = [args.difficulty] if args.difficulty else [label for label, _ in DIFFICULTIES]
+    for label in labels:
+        mines = getMineCount(dict(DIFFICULTIES)[label])
+        start = time.perf_counter()
+        totals = None
+        for totals in runSimulations(mines, args.simulate, args.seed, args.processes,
+                                     width=FIELDWIDTH, height=FIELDHEIGHT):
+            if args.verbose:
+                printSimulationReport(label, totals, time.perf_counter() - start)
+        printSimulationReport(label, totals, time.perf_counter() - start)
+
+# ===================== Input recording and replay =====================
+
+class GameRecorder:
+    def __init__(self, filename):
+        # Input log, one compact JSON array per line: ["game", {...}] with
+        # what is needed to rebuild the board, then [ms, action] or
+        # [ms, action, x, y] for every input with the game's age in
+        # milliseconds, and ["end", {...}] with the result
+        self._file = open(filename, 'w')
+
+    def _write(self, item):
+        self._file.write(json.dumps(item, separators=(',', ':')) + '\n')
+
+    def start(self, game):
+        self._write(['game', game.describe()])
+
+    def record(self, game, now, action, x=None, y=None):
+        # now is the game's clock reading for the input
+        age = now - game.created_at
+        self._write([age, action] if x is None else [age, action, int(x), int(y)])
+
+    def finish(self, game):
+        self._write(['end', {'win': game.win, 'time': game.final_time,
+                             'revealed': game.minefield.get_revealed_count()}])
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+def loadRecording(filename):
+    # Split an input log into (header, actions, result) per game; result is
+    # None for a game that was left unfinished
+    with open(filename, 'r') as f:
+        lines = [line for line in f.read().split('\n') if line.strip()]
+    games = []
+    for item in json.loads('[' + ','.join(lines) + ']'):
+        if item[0] == 'game':
+            games.append((item[1], [], None))
+        elif item[0] == 'end':
+            games[-1] = games[-1][:2] + (item[1],)
+        else:
+            games[-1][1].append(item)
+    return games
+
+def buildRecordedBoard(header):
+    # The same board the recorded game was played on: the seed fixes the
+    # mines, placed either up front, around the no-guess start box, or
+    # (first-click-safe boards) at the first reveal of the replay
+    board = Minefield(header['width'], header['height'], header['mines'], header['seed'], first_click_safe=True)
+    if header['placed']:
+        if header['safe_start'] is None:
+            board.place_mines()
+            board.place_numbers()
+        else:
+            board.place_mines_around(header['safe_start'])
+    return board
+
+def replayGame(header, actions, clock=None):
+    # Feed the recorded inputs straight into a Game on a StepClock set to
+    # each input's time. Returns the game and the slowest input in seconds.
+    clock = clock or StepClock()
+    game = Game(header['width'], header['height'], header['mines'], None, clock=clock,
+                difficulty=header['difficulty'], board=buildRecordedBoard(header))
+    slowest = 0.0
+    for action in actions:
+        clock.now = game.created_at + action[0]
+        started = time.perf_counter()
+        if action[1] == REPLAY_PAUSE:
+            game.toggle_pause()
+        else:
+            game.handle_click(action[2], action[3], right_click=action[1] == REPLAY_FLAG)
+        slowest = max(slowest, time.perf_counter() - started)
+    return game, slowest
+
+def getReplayResult(game):
+    return {'win': game.win, 'time': game.final_time, 'revealed': game.minefield.get_revealed_count()}
+
+def runReplayCommand(args):
+    # --replay FILE --headless: replay every game as fast as possible,
+    # check it ends as recorded and report the slowest input
+    games = loadRecording(args.replay)
+    start = time.perf_counter()
+    mismatches = []
+    slowest = (0.0, None)
+    inputs = 0
+    for number, (header, actions, result) in enumerate(games):
+        inputs += len(actions)
+        game, seconds = replayGame(header, actions)
+        if result is not None and getReplayResult(game) != result:
+            mismatches.append((number, result, getReplayResult(game)))
+        slowest = max(slowest, (seconds, number))
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {len(games)} games in {elapsed:.2f}s ({len(games) / max(elapsed, 1e-9):.0f} games/s), "
+          f"{inputs / max(elapsed, 1e-9):.0f} inputs/s, {len(mismatches)} mismatches")
+    if slowest[1] is not None:
+        print(f"Slowest input: {slowest[0] * 1000:.2f} ms in game {slowest[1]}")
+    for number, expected, actual in mismatches[:10]:
+        print(f"  game {number}: recorded {expected}, replayed {actual}")
+    return not mismatches
+
+class ReplayFeed:
+    def __init__(self, games):
+        # Plays recorded games in the window: hands out each game in turn
+        # and its inputs once the game's own clock reaches their time
+        self._games = collections.deque(games)
+        self._actions = collections.deque()
+
+    def next_game(self):
+        # Next recorded game (on the real clock), or None when done
+        if not self._games:
+            return None
+        header, actions, _ = self._games.popleft()
+        self._actions = collections.deque(actions)
+        return Game(header['width'], header['height'], header['mines'], None,
+                    difficulty=header['difficulty'], board=buildRecordedBoard(header))
+
+    def due(self, game):
+        # Inputs whose time has come, oldest first
+        while self._actions and self._actions[0][0] <= game.get_age():
+            yield self._actions.popleft()
+
+    def wait_ms(self, game):
+        # Milliseconds until the next input, None if there are no more
+        if not self._actions:
+            return None
+        return max(self._actions[0][0] - game.get_age(), 0)
+
+# ===================== Benchmarks (engine and renderer hot paths) =====================
+
+def findLargestZeroRegion(minefield):
+    # Start box of the biggest blank area. Returns (x, y, boxes it opens).
+    largest = analyzeBoard(minefield)['largest_root']
+    if largest is None:
+        return None, None, 0
+    x, y = divmod(largest, minefield.get_height())
+    opened = len(minefield.reveal(x, y))
+    minefield.cover_all()
+    return x, y, opened
+
+def timeBenchCase(run, reset=None):
+    # Fastest time of one call over BENCH_REPEATS samples. A case with a
+    # reset (one call uses its state up) is timed one call per sample;
+    # others repeat the call until a sample lasts BENCH_MIN_TIME.
+    calls = 1
+    if reset is None:
+        while True:
+            started = time.perf_counter()
+            for _ in range(calls):
+                run()
+            if time.perf_counter() - started >= BENCH_MIN_TIME:
+                break
+            calls *= 2
+    best = math.inf
+    gc.disable()
+    try:
+        for _ in range(BENCH_REPEATS):
+            if reset is not None:
+                reset()
+            started = time.perf_counter()
+            for _ in range(calls):
+                run()
+            best = min(best, (time.perf_counter() - started) / calls)
+    finally:
+        gc.enable()
+    return best
+
+def measureBenchPeak(run, reset=None):
+    # Peak memory allocated (Python and NumPy) during one call, in bytes
+    if reset is not None:
+        reset()
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def buildBenchCases(width, height, density):
+    # (name, unit, units per call, run, reset) for every hot path on one
+    # board. The renderer draws through the globals main() sets up, so
+    # they are pointed at this board first.
+    global FIELDWIDTH, FIELDHEIGHT, CAMERA
+    FIELDWIDTH, FIELDHEIGHT = width, height
+    mine_count = max(1, round(width * height * density))
+    minefield = Minefield(width, height, mine_count, BENCH_SEED)
+    start_x, start_y, region = findLargestZeroRegion(minefield)
+    rng = np.random.default_rng(BENCH_SEED)
+    def checkWin():
+        for _ in range(BENCH_WIN_CHECKS):
+            minefield.all_safe_revealed()
+    cases = [('engine.create', 'boxes/s', width * height,
+              lambda: Minefield(width, height, mine_count, BENCH_SEED), None),
+             ('engine.win_check', 'calls/s', BENCH_WIN_CHECKS, checkWin, None),
+             ('analysis.3bv', 'boxes/s', width * height, lambda: countBBBV(minefield.get_grid()), None)]
+    if start_x is not None:
+        def coverAndOpenStart():
+            minefield.cover_all()
+            minefield.set_revealed(start_x, start_y)
+        cases += [('engine.reveal', 'boxes/s', region, lambda: minefield.reveal(start_x, start_y), minefield.cover_all),
+                  ('engine.reveal_zeros', 'boxes/s', region - 1,
+                   lambda: minefield.reveal_zeros(start_x, start_y), coverAndOpenStart)]
+    flags = [divmod(int(i), height) for i in rng.integers(width * height, size=BENCH_FLAGS)]
+    def toggleFlags():
+        # Every box twice, so the board ends as it started
+        for x, y in flags:
+            minefield.toggle_flag(x, y)
+            minefield.toggle_flag(x, y)
+    cases.append(('engine.flag', 'toggles/s', 2 * BENCH_FLAGS, toggleFlags, None))
+
+    # Rendering: a full frame of the board with the largest blank area
+    # open, at the default zoom and zoomed all the way out
+    if start_x is not None:
+        minefield.reveal(start_x, start_y)
+    renderer = BoardRenderer()
+    def renderFrame():
+        renderer.invalidate_all()
+        renderer.render(DISPLAYSURFACE, minefield, full=True)
+    CAMERA = Camera(width, height)
+    camera = CAMERA
+    view = getViewRect()
+    def renderOverview():
+        global CAMERA
+        CAMERA = overview
+        renderFrame()
+        CAMERA = camera
+    overview = Camera(width, height)
+    overview.zoom(-len(ZOOM_PITCHES), view.centerx, view.centery)
+    pixels = list(zip(rng.integers(view.left, view.right, size=BENCH_PICKS).tolist(),
+                      rng.integers(view.top, view.bottom, size=BENCH_PICKS).tolist()))
+    cases += [('render.frame', 'frames/s', 1, renderFrame, None),
+              ('render.overview', 'frames/s', 1, renderOverview, None),
+              ('render.pick', 'lookups/s', BENCH_PICKS, lambda: [getBoxAtPixel(x, y) for x, y in pixels], None)]
+    return cases
+
+def runBenchmarks(sizes=BENCH_SIZES, densities=BENCH_DENSITIES):
+    # Time every case on every board. Returns {case name: result}.
+    global DISPLAYSURFACE, BASICFONT, TILES, HEATTILES
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.display.init()
+    pygame.font.init()
+    DISPLAYSURFACE = pygame.display.set_mode((WINDOWWIDTH, WINDOWHEIGHT))
+    BASICFONT = loadFont(FONTSIZE, bold=True)
+    TILES = buildTileAtlas()
+    HEATTILES = buildHeatTiles()
+    results = {}
+    for width, height in sizes:
+        for density in densities:
+            for case, unit, units, run, reset in buildBenchCases(width, height, density):
+                name = f"{case} {width}x{height} {density:.0%}"
+                seconds = timeBenchCase(run, reset)
+                results[name] = {'seconds': seconds, 'unit': unit, 'rate': units / seconds,
+                                 'peak_bytes': measureBenchPeak(run, reset)}
+                print(f"{name:<36} {seconds * 1000:10.3f} ms {units / seconds:14,.0f} {unit:<10}"
+                      f" {results[name]['peak_bytes'] / 1024:10,.0f} KiB peak")
+    return results
+
+def compareBenchmarks(results, baseline, threshold):
+    # Cases slower than the baseline by more than threshold, as
+    # (name, baseline seconds, seconds)
+    regressions = []
+    for name, result in results.items():
+        if name in baseline and result['seconds'] > baseline[name]['seconds'] * (1 + threshold):
+            regressions.append((name, baseline[name]['seconds'], result['seconds']))
+    return regressions
+
+def runBenchCommand(args):
+    # --bench: time the suite, optionally save it as a baseline and/or
+    # check it against one. Returns False if anything regressed.
+    sizes = [args.size] if args.size else BENCH_SIZES
+    results = runBenchmarks(sizes)
+    if args.save_baseline:
+        data = {'python': platform.python_version(), 'numpy': np.__version__,
+                'machine': platform.machine(), 'cases': results}
+        writeFileAtomically(args.save_baseline, json.dumps(data, indent=1))
+        print(f"Saved {len(results)} cases to {args.save_baseline}")
+    if not args.baseline:
+        return True
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)['cases']
+    regressions = compareBenchmarks(results, baseline, args.threshold)
+    print(f"{len(regressions)} of {len(results)} cases more than {args.threshold:.0%} slower than {args.baseline}")
+    for name, before, after in regressions:
+        print(f"  {name}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms ({after / before - 1:+.0%})")
+    return not regressions
+
+# ===================== Batched environment (many boards stepped at once) =====================
+
+def buildObservationTable():
+    # Observation code for every possible cell byte, so a whole batch of
+    # boards converts to observations with one table lookup
+    table = np.empty(256, dtype=np.int8)
+    for cell in range(256):
+        if not cell & CELL_REVEALED:
+            table[cell] = OBS_FLAGGED if cell & CELL_FLAGGED else OBS_COVERED
+        elif cell & CELL_MINE:
+            table[cell] = OBS_MINE
+        else:
+            table[cell] = cell & CELL_COUNT_MASK
+    return table
 
-        # ===================== Refresh screen and control FPS =====================
+OBSERVATIONS = buildObservationTable()
 
-        pygame.display.update()
-        FPSCLOCK.tick(FPS)
+class MinefieldBatch:
+    def __init__(self, count, width, height, mine_count, seed=None):
+        # N boards stored as one (N, width, height) array of packed cell bytes,
+        # using the same layout and reveal rules as Minefield
+        self._count = count
+        self._width = width
+        self._height = height
+        self._mine_count = mine_count
+        self._safe_total = width * height - mine_count
+        self._rng = np.random.default_rng(seed)
+        self._cells = np.zeros((count, width, height), dtype=np.uint8)
+        self._revealed_safe = np.zeros(count, dtype=np.int64)
+        self._done = np.zeros(count, dtype=bool)
+        self._won = np.zeros(count, dtype=bool)
+        # Observations are kept up to date in place for just the boxes that change
+        self._obs = np.full((count, width, height), OBS_COVERED, dtype=np.int8)
+        self.reset()
+
+    def reset(self, mask=None):
+        # Deal fresh boards, either all of them or where mask is True
+        boards = np.arange(self._count) if mask is None else np.flatnonzero(mask)
+        if not len(boards):
+            return self.observe()
+        # Mine positions: the mine_count smallest of a row of random keys
+        keys = self._rng.random((len(boards), self._width * self._height))
+        positions = np.argpartition(keys, self._mine_count - 1, axis=1)[:, :self._mine_count]
+        mines = np.zeros((len(boards), self._width * self._height), dtype=bool)
+        np.put_along_axis(mines, positions, True, axis=1)
+        mines = mines.reshape(len(boards), self._width, self._height)
+        counts = countNeighbors(mines)
+        counts[mines] = 0
+        self._cells[boards] = counts | (mines * np.uint8(CELL_MINE))
+        self._obs[boards] = OBS_COVERED
+        self._revealed_safe[boards] = 0
+        self._done[boards] = False
+        self._won[boards] = False
+        return self.observe()
+
+    def step(self, actions):
+        # Apply one (kind, x, y) action per board. kind is ACTION_REVEAL or
+        # ACTION_FLAG; boards that are already done ignore their action.
+        # Rewards: the fraction of safe boxes newly uncovered, plus
+        # REWARD_WIN on a win, or REWARD_LOSS for hitting a mine.
+        actions = np.asarray(actions)
+        kinds, xs, ys = actions[:, 0], actions[:, 1], actions[:, 2]
+        boards = np.arange(self._count)
+        cells = self._cells
+        rewards = np.zeros(self._count)
+        picked = cells[boards, xs, ys]
+        live = ~self._done & ((picked & CELL_REVEALED) == 0)
+
+        flag = live & (kinds == ACTION_FLAG)
+        cells[boards[flag], xs[flag], ys[flag]] ^= CELL_FLAGGED
+        self._obs[boards[flag], xs[flag], ys[flag]] = OBSERVATIONS[cells[boards[flag], xs[flag], ys[flag]]]
+
+        reveal = live & (kinds == ACTION_REVEAL)
+        b, x, y = boards[reveal], xs[reveal], ys[reveal]
+        # As on a Minefield, a revealed box loses its flag
+        cells[b, x, y] = cells[b, x, y] & (~CELL_FLAGGED & 0xFF) | CELL_REVEALED
+        self._obs[b, x, y] = OBSERVATIONS[cells[b, x, y]]
+        hit = (picked[reveal] & CELL_MINE) != 0
+        opened = np.zeros(self._count, dtype=np.int64)
+        opened[b[~hit]] = 1
+        lost = b[hit]
+        self._done[lost] = True
+        rewards[lost] = REWARD_LOSS
+
+        # Flood out from every board whose click landed on a zero
+        zero = ~hit & ((picked[reveal] & CELL_COUNT_MASK) == 0)
+        if zero.any():
+            opened[b[zero]] += self._flood(b[zero], x[zero], y[zero])
+
+        self._revealed_safe += opened
+        rewards += opened / self._safe_total
+        won = ~self._done & (self._revealed_safe == self._safe_total)
+        self._done |= won
+        self._won |= won
+        rewards[won] += REWARD_WIN
+        return self.observe(), rewards, self._done.copy()
+
+    def _flood(self, boards, xs, ys):
+        # Grow each board's newly opened zero one ring at a time, all boards
+        # together, until no board opens anything new. Returns the number of
+        # boxes each board opened.
+        sub = self._cells[boards]
+        frontier = np.zeros(sub.shape, dtype=bool)
+        frontier[np.arange(len(boards)), xs, ys] = True
+        opened = np.zeros(len(boards), dtype=np.int64)
+        # Boards drop out of the working set as soon as their flood stops
+        active = np.arange(len(boards))
+        while len(active):
+            cells = sub[active]
+            ring = dilate(frontier) & ((cells & CELL_REVEALED) == 0)
+            cells |= ring * np.uint8(CELL_REVEALED)
+            cells &= ~(ring * np.uint8(CELL_FLAGGED))
+            sub[active] = cells
+            opened[active] += ring.sum(axis=(1, 2))
+            frontier = ring & ((cells & (CELL_MINE | CELL_COUNT_MASK)) == 0)
+            growing = frontier.any(axis=(1, 2))
+            active, frontier = active[growing], frontier[growing]
+        self._cells[boards] = sub
+        self._obs[boards] = OBSERVATIONS[sub]
+        return opened
+
+    def observe(self):
+        # What a player sees: the number on revealed boxes, OBS_COVERED,
+        # OBS_FLAGGED, or OBS_MINE for a revealed mine
+        return self._obs.copy()
+
+    def get_done(self):
+        return self._done.copy()
+
+    def get_won(self):
+        return self._won.copy()
+
+    def get_revealed_counts(self):
+        return self._revealed_safe.copy()
+
+    def get_cells(self):
+        return self._cells
+
+# ===================== Game server (many boards over line-delimited JSON) =====================
+
+def describeCells(minefield, indices):
+    # [x, y, value] for each flat index, value being what a player sees:
+    # the number, OBS_COVERED, OBS_FLAGGED or OBS_MINE
+    indices = np.unique(np.asarray(indices, dtype=np.intp))
+    xs, ys = np.divmod(indices, minefield.get_height())
+    values = OBSERVATIONS[minefield.get_grid().reshape(-1)[indices]]
+    return np.stack((xs, ys, values), axis=1).tolist()
+
+class GameServer:
+    def __init__(self, score_manager):
+        # Hosts any number of games for clients that send one JSON object per
+        # line and get one back per request:
+        #   {"op": "new", "difficulty": "HARD"}  (or width/height/mines/seed/board/scored)
+        #   {"op": "reveal" | "flag", "game": id, "x": x, "y": y}
+        #   {"op": "state" | "close", "game": id}
+        # Moves answer with only the boxes that changed. Games belong to the
+        # connection that made them and end with it. Wins are only kept with
+        # a score_manager (--scores FILE) and are written by one worker
+        # thread, so the event loop never waits on the disk.
+        self.score_manager = score_manager
+        self._games = {}
+        self._scored = set() # Games whose win goes to the score store
+        self._next_id = 1
+        self._score_writer = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    async def serve(self, host=SERVER_HOST, port=SERVER_PORT, path=None):
+        if path:
+            server = await asyncio.start_unix_server(self._connection, path)
+        else:
+            server = await asyncio.start_server(self._connection, host, port)
+        print(f"Serving games on {path or f'{host}:{port}'}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._score_writer.shutdown(wait=True)
+
+    async def _connection(self, reader, writer):
+        owned = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("a request is a JSON object")
+                    reply = await self.handle(request, owned)
+                    if 'id' in request:
+                        reply['id'] = request['id']
+                except (ValueError, KeyError, TypeError, OverflowError) as error:
+                    reply = {'ok': False, 'error': f"{type(error).__name__}: {error}"}
+                writer.write(json.dumps(reply, separators=(',', ':')).encode() + b'\n')
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for game_id in owned:
+                self._games.pop(game_id, None)
+                self._scored.discard(game_id)
+            writer.close()
+
+    async def handle(self, request, owned):
+        # Answer one request from the connection owning the games in owned
+        op = request['op']
+        if op == 'new':
+            return await self._new(request, owned)
+        game_id = request['game']
+        if game_id not in owned:
+            raise KeyError(f"no game {game_id}")
+        game = self._games[game_id]
+        if op in ('reveal', 'flag'):
+            x, y = int(request['x']), int(request['y'])
+            minefield = game.minefield
+            if not (0 <= x < minefield.get_width() and 0 <= y < minefield.get_height()):
+                raise ValueError(f"box ({x}, {y}) is off the board")
+            was_over = game.game_over
+            changed = game.handle_click(x, y, right_click=op == 'flag')
+            if game.win and not was_over and game_id in self._scored:
+                # The 3BV is worked out on the writer thread too
+                await asyncio.get_running_loop().run_in_executor(
+                    self._score_writer, lambda: self.score_manager.save_score(
+                        game.difficulty, game.get_elapsed_seconds(), getScoreDetails(game)))
+            return {'ok': True, 'cells': describeCells(minefield, changed),
+                    'over': game.game_over, 'win': game.win, 'time': game.update_timer()}
+        if op == 'state':
+            return {'ok': True, 'board': OBSERVATIONS[game.minefield.get_grid()].tolist(),
+                    'over': game.game_over, 'win': game.win, 'time': game.update_timer()}
+        if op == 'close':
+            owned.discard(game_id)
+            del self._games[game_id]
+            self._scored.discard(game_id)
+            return {'ok': True}
+        raise ValueError(f"unknown op {op!r}")
+
+    async def _new(self, request, owned):
+        # Start a game; only unmodified difficulties on the standard board
+        # count for best times, as in the window, and "scored": false opts out
+        difficulty = request.get('difficulty', 'NORMAL')
+        mine_count = dict(DIFFICULTIES)[difficulty]
+        width, height = int(request.get('width', VIEWWIDTH)), int(request.get('height', VIEWHEIGHT))
+        mine_count = int(request.get('mines', round(mine_count * width * height / (VIEWWIDTH * VIEWHEIGHT))))
+        if not (width > 0 and height > 0 and width * height <= SERVER_MAX_BOXES and 0 <= mine_count < width * height):
+            raise ValueError(f"cannot make a {width}x{height} board with {mine_count} mines")
+        seed = int(request.get('seed', np.random.SeedSequence().entropy))
+        mode = request.get('board', BOARD_RANDOM)
+        board = None
+        if mode == BOARD_NOGUESS:
+            # Generate-and-test can take a while, so it runs off the event loop
+            board = await asyncio.get_running_loop().run_in_executor(
+                None, generateNoGuessBoard, width, height, mine_count, seed)
+        elif mode not in (BOARD_RANDOM, BOARD_SAFE):
+            raise ValueError(f"unknown board {mode!r}")
+        game = Game(width, height, mine_count, None, clock=getTicks, seed=seed, difficulty=difficulty,
+                    board=board, first_click_safe=mode == BOARD_SAFE)
+        game_id = self._next_id
+        self._next_id += 1
+        self._games[game_id] = game
+        owned.add(game_id)
+        if (self.score_manager is not None and request.get('scored', True) is not False
+                and (width, height) == (VIEWWIDTH, VIEWHEIGHT) and 'mines' not in request):
+            self._scored.add(game_id)
+        start = game.minefield.get_safe_start()
+        return {'ok': True, 'game': game_id, 'width': width, 'height': height, 'mines': mine_count,
+                'seed': seed, 'start': None if start is None else list(divmod(start, height))}
+
+async def openServerConnection(host, port, path=None):
+    if path:
+        return await asyncio.open_unix_connection(path)
+    return await asyncio.open_connection(host, port)
+
+async def runLoadClient(host, port, path, deadline, latencies, counts):
+    # One player: start a game, click random covered boxes (now and then
+    # flagging one) until it ends, close it and start the next. Every
+    # request waits for its reply, so latencies are round trips. The games
+    # ask not to be scored, so bot wins never reach the best times.
+    reader, writer = await openServerConnection(host, port, path)
+    rng = np.random.default_rng()
+
+    async def call(request):
+        started = time.perf_counter()
+        writer.write(json.dumps(request).encode() + b'\n')
+        reply = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - started)
+        if not reply['ok']:
+            counts['errors'] += 1
+        return reply
+
+    try:
+        while time.perf_counter() < deadline:
+            game = await call({'op': 'new', 'difficulty': DIFFICULTIES[rng.integers(len(DIFFICULTIES))][0],
+                               'scored': False})
+            covered = np.ones(game['width'] * game['height'], dtype=bool)
+            over = False
+            while not over and covered.any() and time.perf_counter() < deadline:
+                x, y = divmod(int(rng.choice(np.flatnonzero(covered))), game['height'])
+                op = 'flag' if rng.random() < LOADGEN_FLAG_RATE else 'reveal'
+                reply = await call({'op': op, 'game': game['game'], 'x': x, 'y': y})
+                for cx, cy, value in reply['cells']:
+                    covered[cx * game['height'] + cy] = value == OBS_COVERED
+                over = reply['over']
+            counts['games'] += 1
+            counts['wins'] += bool(over and reply['win'])
+            await call({'op': 'close', 'game': game['game']})
+    finally:
+        writer.close()
+
+def runLoadGenerator(args):
+    # --loadgen: hammer a running --server and report requests per second
+    # and round-trip latency percentiles
+    latencies = []
+    counts = {'games': 0, 'wins': 0, 'errors': 0}
+
+    async def run():
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(*(runLoadClient(args.host, args.port, args.unix, deadline, latencies, counts)
+                               for _ in range(args.clients)))
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    milliseconds = np.array(latencies) * 1000
+    p50, p99, p999 = np.percentile(milliseconds, (50, 99, 99.9)) if len(milliseconds) else (0.0, 0.0, 0.0)
+    print(f"{len(latencies)} requests from {args.clients} clients in {elapsed:.1f}s: "
+          f"{len(latencies) / elapsed:.0f} requests/s, {counts['games']} games, {counts['wins']} wins, "
+          f"{counts['errors']} errors")
+    print(f"Latency p50 {p50:.2f} ms, p99 {p99:.2f} ms, p99.9 {p999:.2f} ms, "
+          f"max {milliseconds.max() if len(milliseconds) else 0.0:.2f} ms")
+
+def runServerCommand(args):
+    # --server: host games until interrupted, keeping wins only with --scores
+    score_manager = ScoreManager(args.scores, legacy_filename=None) if args.scores else None
+    try:
+        asyncio.run(GameServer(score_manager).serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+def parseSize(text):
+    # "WxH" -> (W, H) for --size
+    try:
+        width, height = (int(part) for part in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {text!r}")
+    if width < 1 or height < 1:
+        raise argparse.ArgumentTypeError("the board needs at least one box")
+    return width, height
+
+def parseArguments(argv=None):
+    parser = argparse.ArgumentParser(description='Minesweeper Legacy')
+    parser.add_argument('--simulate', type=int, metavar='GAMES',
+                        help='play GAMES headless games per difficulty and print statistics')
+    parser.add_argument('--difficulty', choices=[label for label, _ in DIFFICULTIES],
+                        help='only simulate this difficulty')
+    parser.add_argument('--processes', type=int, help='worker processes (default: all cores)')
+    parser.add_argument('--seed', type=int, default=0, help='first board seed')
+    parser.add_argument('--verbose', action='store_true', help='print totals after every shard')
+    parser.add_argument('--size', type=parseSize, metavar='WxH',
+                        help='board size in boxes, e.g. 5000x5000 (mine counts scale with the area)')
+    parser.add_argument('--endless', action='store_true', help='play an endless board')
+    parser.add_argument('--resume', nargs='?', const=SNAPSHOT_FILE, metavar='FILE',
+                        help=f'continue a saved game (default: {SNAPSHOT_FILE}, saved every {AUTOSAVE_MOVES} moves)')
+    parser.add_argument('--record', metavar='FILE', help='log the board and every input of each game to FILE')
+    parser.add_argument('--replay', metavar='FILE', help='play back a log recorded with --record')
+    parser.add_argument('--headless', action='store_true',
+                        help='with --replay: replay without a window as fast as possible and check the results')
+    parser.add_argument('--profile', nargs='?', const=PROFILE_FILE, metavar='FILE',
+                        help=f'show the frame profiler and write its trace to FILE on exit (default: {PROFILE_FILE}; .json for JSON)')
+    parser.add_argument('--bench', action='store_true',
+                        help='time the engine and renderer hot paths (only at --size if given)')
+    parser.add_argument('--baseline', metavar='FILE', help='with --bench: fail on cases slower than in FILE')
+    parser.add_argument('--save-baseline', metavar='FILE', help='with --bench: save the timings to FILE')
+    parser.add_argument('--threshold', type=float, default=BENCH_THRESHOLD,
+                        help=f'with --baseline: allowed slowdown as a fraction (default: {BENCH_THRESHOLD})')
+    parser.add_argument('--server', action='store_true',
+                        help='host games for network clients (one JSON request per line)')
+    parser.add_argument('--scores', metavar='FILE', help='with --server: save wins on the standard board to FILE')
+    parser.add_argument('--loadgen', action='store_true', help='load-test a running --server')
+    parser.add_argument('--host', default=SERVER_HOST, help=f'server address (default: {SERVER_HOST})')
+    parser.add_argument('--port', type=int, default=SERVER_PORT, help=f'server port (default: {SERVER_PORT})')
+    parser.add_argument('--unix', metavar='PATH', help='use a Unix socket instead of TCP')
+    parser.add_argument('--clients', type=int, default=LOADGEN_CLIENTS,
+                        help=f'with --loadgen: concurrent players (default: {LOADGEN_CLIENTS})')
+    parser.add_argument('--duration', type=float, default=LOADGEN_SECONDS,
+                        help=f'with --loadgen: seconds to run (default: {LOADGEN_SECONDS:g})')
+    parser.add_argument('--startup-report', action='store_true', help='print how long each startup step took')
+    parser.add_argument('--backfill', action='store_true',
+                        help='add 3BV and 3BV/s to saved wins that can be rebuilt from their board')
+    parser.add_argument('--board', choices=[BOARD_RANDOM, BOARD_SAFE, BOARD_NOGUESS], default=BOARD_RANDOM,
+                        help='kind of board to play: random, first-click-safe or no-guess')
+    return parser.parse_args(argv)
 
 # =========================== Run the code ===========================
 
 if __name__ == '__main__':
-    main()
+    args = parseArguments()
+    BOARDMODE = args.board
+    ENDLESS = args.endless
+    RESUME = args.resume
+    RECORD = args.record
+    REPLAY = args.replay
+    PROFILE = args.profile
+    STARTUP_REPORT = args.startup_report
+    if args.size:
+        FIELDWIDTH, FIELDHEIGHT = args.size
+    if args.simulate:
+        runSimulationCommand(args)
+    elif args.backfill:
+        runBackfillCommand(args)
+    elif args.server:
+        runServerCommand(args)
+    elif args.loadgen:
+        runLoadGenerator(args)
+    elif args.bench:
+        sys.exit(0 if runBenchCommand(args) else 1)
+    elif args.replay and args.headless:
+        sys.exit(0 if runReplayCommand(args) else 1)
+    else:
+        main()